@@ -1,8 +1,104 @@
 #!/usr/bin/env python3
 """Module for password encryption"""
 
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, ThreadPoolExecutor,
+                                wait)
+from typing import Callable, Iterable, Iterator, Optional, Tuple, Union
+
 import bcrypt
 
+TARGET_HASH_MS = float(os.environ.get("BCRYPT_TARGET_MS", "250"))
+MIN_ROUNDS = 12
+MAX_ROUNDS = 16
+CALIBRATION_SAMPLES = 3
+_ROUNDS = []
+_ROUNDS_LOCK = threading.Lock()
+
+
+def calibrate_rounds(target_ms: float = TARGET_HASH_MS,
+                     min_rounds: int = MIN_ROUNDS,
+                     max_rounds: int = MAX_ROUNDS,
+                     samples: int = CALIBRATION_SAMPLES) -> int:
+    """
+    Measures bcrypt on this host and picks the highest work factor whose
+    hash time fits the latency budget.
+
+    Each extra round doubles the hash time, so probe hashes at min_rounds
+    are enough to extrapolate every other cost; the fastest probe is
+    used, since contention only ever makes a probe slower.
+
+    Args:
+        target_ms: Latency budget for one hash in milliseconds
+        min_rounds: Lowest work factor ever returned
+        max_rounds: Highest work factor ever returned
+        samples: Number of probe hashes
+
+    Returns:
+        bcrypt work factor to use on this host
+    """
+    rounds = min_rounds
+    elapsed_ms = None
+    for _ in range(max(samples, 1)):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+        probe_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms is None or probe_ms < elapsed_ms:
+            elapsed_ms = probe_ms
+    while rounds < max_rounds and elapsed_ms * 2 <= target_ms:
+        elapsed_ms *= 2
+        rounds += 1
+    return rounds
+
+
+def get_rounds() -> int:
+    """
+    Returns the work factor for new hashes, calibrated once per process
+    unless pinned with the BCRYPT_ROUNDS environment variable.
+
+    Calibration runs under a lock, so concurrent first callers wait for
+    one measurement instead of each probing while the others hash.
+
+    Returns:
+        bcrypt work factor
+    """
+    if not _ROUNDS:
+        with _ROUNDS_LOCK:
+            if not _ROUNDS:
+                pinned = os.environ.get("BCRYPT_ROUNDS")
+                _ROUNDS.append(int(pinned) if pinned
+                               else calibrate_rounds())
+    return _ROUNDS[0]
+
+
+def hash_rounds(hashed_password: bytes) -> int:
+    """
+    Reads the work factor stored in a bcrypt hash.
+
+    Args:
+        hashed_password: Bytes string representing the hashed password
+
+    Returns:
+        Work factor the hash was computed with
+    """
+    return int(hashed_password.split(b"$")[2])
+
+
+def needs_rehash(hashed_password: bytes) -> bool:
+    """
+    Tells whether a hash uses a weaker cost than the current one.
+
+    Args:
+        hashed_password: Bytes string representing the hashed password
+
+    Returns:
+        Boolean indicating whether the password should be rehashed
+    """
+    return hash_rounds(hashed_password) < get_rounds()
+
 
 def hash_password(password: str) -> bytes:
     """
@@ -14,7 +110,8 @@ def hash_password(password: str) -> bytes:
     Returns:
         Salted, hashed password as a byte string
     """
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    return bcrypt.hashpw(password.encode('utf-8'),
+                         bcrypt.gensalt(get_rounds()))
 
 
 def is_valid(hashed_password: bytes, password: str) -> bool:
@@ -31,6 +128,112 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed_password)
 
 
+def verify_and_update(hashed_password: bytes,
+                      password: str) -> Tuple[bool, Optional[bytes]]:
+    """
+    Validates a password and rehashes it if its cost is stale.
+
+    Args:
+        hashed_password: Bytes string representing the hashed password
+        password: String representing the password to check
+
+    Returns:
+        Tuple of a boolean indicating whether the password is valid and
+        the new hash to store, or None if the stored one is current
+    """
+    if not is_valid(hashed_password, password):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, hash_password(password)
+    return True, None
+
+
+def _run_bounded(func: Callable, items: Iterable, workers: int = None,
+                 ordered: bool = True) -> Iterator:
+    """
+    Applies func to items on a thread pool with bounded in-flight work.
+
+    bcrypt releases the GIL, so threads hash on several cores at once.
+    At most 2 * workers items are pending, so items may be a lazy,
+    arbitrarily long iterable.
+
+    Args:
+        func: Callable applied to each item
+        items: Iterable of arguments for func
+        workers: Number of threads, os.cpu_count() if None
+        ordered: Yield results in input order if True, otherwise yield
+            (index, result) tuples as they complete
+
+    Returns:
+        Iterator over the results
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be positive")
+    limit = 2 * workers
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque() if ordered else set()
+        for index, item in enumerate(items):
+            if ordered:
+                if len(pending) >= limit:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(func, item))
+                continue
+            if len(pending) >= limit:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.index, future.result()
+            future = executor.submit(func, item)
+            future.index = index
+            pending.add(future)
+        if ordered:
+            while pending:
+                yield pending.popleft().result()
+        else:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.index, future.result()
+
+
+def hash_passwords(passwords: Iterable[str], workers: int = None,
+                   ordered: bool = True
+                   ) -> Iterator[Union[bytes, Tuple[int, bytes]]]:
+    """
+    Hashes many passwords in parallel.
+
+    Args:
+        passwords: Iterable of string passwords to be hashed
+        workers: Number of hashing threads, os.cpu_count() if None
+        ordered: Yield hashes in input order if True, otherwise yield
+            (index, hash) tuples as they complete
+
+    Returns:
+        Iterator over the salted, hashed passwords
+    """
+    get_rounds()
+    return _run_bounded(hash_password, passwords, workers, ordered)
+
+
+def verify_many(pairs: Iterable[Tuple[bytes, str]], workers: int = None,
+                ordered: bool = True
+                ) -> Iterator[Union[bool, Tuple[int, bool]]]:
+    """
+    Validates many passwords against their hashes in parallel.
+
+    Args:
+        pairs: Iterable of (hashed_password, password) tuples
+        workers: Number of hashing threads, os.cpu_count() if None
+        ordered: Yield results in input order if True, otherwise yield
+            (index, result) tuples as they complete
+
+    Returns:
+        Iterator over booleans indicating whether each password is valid
+    """
+    return _run_bounded(lambda pair: is_valid(*pair), pairs, workers,
+                        ordered)
+
+
 if __name__ == "__main__":
     password = "MyAmazingPassw0rd"
     encrypted_password = hash_password(password)
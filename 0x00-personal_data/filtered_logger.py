@@ -2,12 +2,102 @@
 """Module for handling personal data"""
 
 import re
+import atexit
 import logging
-from typing import List
+import logging.handlers
+import queue
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, List, TextIO, Tuple
 import os
+import sys
+import threading
+import time
 import mysql.connector
 
 
+class Redactor:
+    """
+    Precompiled redaction engine that obfuscates every field of a log
+    line in a single pass.
+
+    All field names are joined into one alternation, so a message is
+    scanned once regardless of how many fields are redacted.
+    """
+
+    def __init__(self, fields: Tuple[str, ...], redaction: str,
+                 separator: str):
+        """
+        Compiles the redaction pattern.
+
+        Args:
+            fields: Tuple of strings representing fields to obfuscate
+            redaction: String to replace field values
+            separator: String representing the character separating fields
+        """
+        self.fields = tuple(fields)
+        self.redaction = redaction
+        self.separator = separator
+        if self.fields:
+            names = "|".join(re.escape(field) for field in self.fields)
+            self._pattern = re.compile(
+                f"((?:{names})=)[^{re.escape(separator)}]*")
+            self._line_pattern = re.compile(
+                f"((?:{names})=)[^{re.escape(separator)}\\n]*")
+        else:
+            self._pattern = None
+            self._line_pattern = None
+        self._replacement = "\\1" + redaction.replace("\\", "\\\\")
+
+    def redact(self, message: str) -> str:
+        """
+        Obfuscates the configured fields in a log message.
+
+        Args:
+            message: String representing the log line
+
+        Returns:
+            Obfuscated log message
+        """
+        if self._pattern is None:
+            return message
+        return self._pattern.sub(self._replacement, message)
+
+    def redact_many(self, messages: List[str]) -> str:
+        """
+        Obfuscates a batch of single-line messages with one substitution.
+
+        Args:
+            messages: List of strings representing log lines
+
+        Returns:
+            Obfuscated log lines joined by newlines
+        """
+        block = "\n".join(messages)
+        if self._line_pattern is None:
+            return block
+        if block.count("\n") != len(messages) - 1:
+            return "\n".join(self.redact(message) for message in messages)
+        return self._line_pattern.sub(self._replacement, block)
+
+
+@lru_cache(maxsize=128)
+def get_redactor(fields: Tuple[str, ...], redaction: str,
+                 separator: str) -> Redactor:
+    """
+    Returns a cached Redactor for the given configuration.
+
+    Args:
+        fields: Tuple of strings representing fields to obfuscate
+        redaction: String to replace field values
+        separator: String representing the character separating fields
+
+    Returns:
+        Redactor shared by every caller using the same configuration
+    """
+    return Redactor(fields, redaction, separator)
+
+
 def filter_datum(fields: List[str], redaction: str,
                  message: str, separator: str) -> str:
     """
@@ -22,10 +112,8 @@ def filter_datum(fields: List[str], redaction: str,
     Returns:
         Obfuscated log message
     """
-    for field in fields:
-        pattern = f"({field}=)([^{separator}]*)"
-        message = re.sub(pattern, f"\\1{redaction}", message)
-    return message
+    redactor = get_redactor(tuple(fields), redaction, separator)
+    return redactor.redact(message)
 
 
 class RedactingFormatter(logging.Formatter):
@@ -38,6 +126,8 @@ class RedactingFormatter(logging.Formatter):
     def __init__(self, fields: List[str]):
         super(RedactingFormatter, self).__init__(self.FORMAT)
         self.fields = fields
+        self._redactor = get_redactor(tuple(fields), self.REDACTION,
+                                      self.SEPARATOR)
 
     def format(self, record: logging.LogRecord) -> str:
         """
@@ -50,52 +140,437 @@ class RedactingFormatter(logging.Formatter):
             Formatted string with sensitive information redacted
         """
         message = super().format(record)
-        return filter_datum(self.fields, self.REDACTION,
-                            message, self.SEPARATOR)
+        return self._redactor.redact(message)
+
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "sample")
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that applies an overflow policy when the queue is full.
+
+    Policies:
+        block: wait until the listener frees a slot
+        drop_oldest: discard the oldest queued record to make room
+        sample: keep one overflowing record in every sample_rate,
+            replacing the oldest queued record, and drop the rest
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "block",
+                 sample_rate: int = 10):
+        """
+        Initializes the handler.
+
+        Args:
+            log_queue: Bounded queue shared with the listener
+            overflow: One of OVERFLOW_POLICIES
+            sample_rate: Keep one in sample_rate records on overflow
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy: {overflow}")
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.sample_rate = max(1, sample_rate)
+        self.dropped = 0
+        self._overflowed = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """
+        Puts a record on the queue according to the overflow policy.
+
+        Args:
+            record: A LogRecord instance representing the event being logged
+        """
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if self.overflow == "sample":
+            self._overflowed += 1
+            if self._overflowed % self.sample_rate:
+                self.dropped += 1
+                return
+        while True:
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                continue
+
+
+class FlushingQueueListener(logging.handlers.QueueListener):
+    """
+    Queue listener whose stop() waits for a slot in a full queue, so
+    every record queued before shutdown is written.
+    """
+
+    def stop(self) -> None:
+        """Flushes the queue and stops the listener; safe to call twice."""
+        if self._thread is None:
+            return
+        super().stop()
+
+    def enqueue_sentinel(self) -> None:
+        """Puts the stop sentinel on the queue, blocking if it is full."""
+        self.queue.put(self._sentinel)
 
 
 PII_FIELDS = ("name", "email", "phone", "ssn", "password")
+BATCH_SIZE = 1000
+QUEUE_SIZE = 10000
+
+_LOGGERS = {}
+_LOGGERS_LOCK = threading.Lock()
 
 
-def get_logger() -> logging.Logger:
+def get_logger(asynchronous: bool = False, queue_size: int = QUEUE_SIZE,
+               overflow: str = "block", stream: TextIO = None,
+               fields: Tuple[str, ...] = PII_FIELDS,
+               name: str = "user_data") -> logging.Logger:
     """
-    Creates and configures a logger named "user_data".
+    Creates and configures a redacting logger, "user_data" by default.
+
+    Loggers are configured once per name and cached: repeated calls with
+    the same settings return the cached logger without touching its
+    handlers, and a call with new settings replaces them, so records are
+    never written twice.
+
+    In asynchronous mode records are put on a bounded queue and a
+    background listener does the redaction and the write, so callers
+    never wait on the output stream (unless overflow is "block").
+
+    Args:
+        asynchronous: Whether to hand records to a background listener
+        queue_size: Maximum number of queued records in asynchronous mode
+        overflow: Policy applied when the queue is full, one of
+            OVERFLOW_POLICIES
+        stream: Writable text stream, sys.stderr if None
+        fields: Tuple of strings representing fields to obfuscate
+        name: Name of the logger
 
     Returns:
         logging.Logger: Configured logger object
     """
-    logger = logging.getLogger("user_data")
-    logger.setLevel(logging.INFO)
-    logger.propagate = False
+    key = (asynchronous, queue_size, overflow, stream, tuple(fields))
+    cached = _LOGGERS.get(name)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with _LOGGERS_LOCK:
+        cached = _LOGGERS.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        logger = logging.getLogger(name)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            listener = getattr(handler, "listener", None)
+            if listener is not None:
+                listener.stop()
+
+        stream_handler = logging.StreamHandler(stream)
+        stream_handler.setFormatter(RedactingFormatter(list(fields)))
+
+        if asynchronous:
+            log_queue = queue.Queue(maxsize=queue_size)
+            queue_handler = BoundedQueueHandler(log_queue, overflow)
+            listener = FlushingQueueListener(log_queue, stream_handler)
+            queue_handler.listener = listener
+            listener.start()
+            atexit.register(listener.stop)
+            logger.addHandler(queue_handler)
+        else:
+            logger.addHandler(stream_handler)
+
+        _LOGGERS[name] = (key, logger)
+        return logger
+
+
+class PooledConnection:
+    """
+    Proxy around a pooled DB-API connection.
 
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(RedactingFormatter(list(PII_FIELDS)))
+    Every attribute is delegated to the underlying connection except
+    close(), which hands the connection back to its pool. A proxy that
+    is never closed keeps its connection checked out, since cursors may
+    still be using it; the pool reports such checkouts when it times out.
+    """
+
+    def __init__(self, pool: "ConnectionPool", connection):
+        """
+        Wraps a connection borrowed from a pool.
+
+        Args:
+            pool: ConnectionPool the connection belongs to
+            connection: Underlying DB-API connection
+        """
+        self._pool = pool
+        self._connection = connection
 
-    logger.addHandler(stream_handler)
+    def __getattr__(self, name: str):
+        """Delegates attribute access to the underlying connection."""
+        if self._connection is None:
+            raise AttributeError(f"connection returned to pool: {name}")
+        return getattr(self._connection, name)
 
-    return logger
+    def __enter__(self) -> "PooledConnection":
+        """Returns the connection for use in a with block."""
+        return self
 
+    def __exit__(self, *exc) -> None:
+        """Returns the connection to the pool at the end of a with block."""
+        self.close()
 
-def get_db() -> mysql.connector.connection.MySQLConnection:
+    def close(self) -> None:
+        """Returns the connection to the pool; safe to call twice."""
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection)
+
+
+def _ping(connection) -> bool:
     """
-    Connects to the MySQL database using environment variables.
+    Checks that a DB-API connection is still usable.
+
+    Args:
+        connection: Underlying DB-API connection
 
     Returns:
-        mysql.connector.connection.MySQLConnection: Database connection object
+        Boolean indicating whether the connection answered
+    """
+    try:
+        if hasattr(connection, "is_connected"):
+            return bool(connection.is_connected())
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections.
+
+    Holds up to size idle connections and opens up to max_overflow more
+    under load, closing those when they are released. Idle connections
+    older than idle_timeout seconds are closed on checkout and the others
+    are health checked before being handed out.
+    """
+
+    def __init__(self, connect: Callable[[], Any], size: int = 5,
+                 max_overflow: int = 5, idle_timeout: float = 300.0,
+                 health_check: Callable[[Any], bool] = _ping):
+        """
+        Initializes an empty pool.
+
+        Args:
+            connect: Callable returning a new DB-API connection
+            size: Number of connections kept open between checkouts
+            max_overflow: Extra connections allowed while under load
+            idle_timeout: Seconds after which an idle connection is closed
+            health_check: Callable telling whether a connection is usable
+        """
+        if size < 1 or max_overflow < 0:
+            raise ValueError("size must be positive, max_overflow >= 0")
+        self._connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.idle_timeout = idle_timeout
+        self._health_check = health_check
+        self._idle = deque()
+        self._open = 0
+        self._checked_out = {}
+        self._cond = threading.Condition()
+        self.stats = {"created": 0, "discarded": 0, "checkouts": 0,
+                      "waits": 0, "wait_time": 0.0, "max_wait_time": 0.0}
+
+    def acquire(self, timeout: float = None) -> PooledConnection:
+        """
+        Borrows a connection, waiting if the pool is exhausted.
+
+        Args:
+            timeout: Maximum seconds to wait, forever if None
+
+        Returns:
+            PooledConnection returning to the pool when closed
+
+        Raises:
+            TimeoutError: If no connection became available in time
+        """
+        start = time.monotonic()
+        waited = False
+        while True:
+            with self._cond:
+                if self._idle:
+                    connection, released = self._idle.pop()
+                elif self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    break
+                else:
+                    remaining = None
+                    if timeout is not None:
+                        remaining = timeout - (time.monotonic() - start)
+                        if remaining <= 0:
+                            raise TimeoutError(self._exhausted_message())
+                    waited = True
+                    self._cond.wait(remaining)
+                    continue
+            healthy = time.monotonic() - released <= self.idle_timeout \
+                and self._health_check(connection)
+            with self._cond:
+                if healthy:
+                    return self._checkout(connection, start, waited)
+                self._discard(connection)
+        try:
+            connection = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.stats["created"] += 1
+            return self._checkout(connection, start, waited)
+
+    def _checkout(self, connection, start: float,
+                  waited: bool) -> PooledConnection:
+        """Records checkout metrics and wraps the connection."""
+        self.stats["checkouts"] += 1
+        self._checked_out[id(connection)] = (
+            time.monotonic(), threading.current_thread().name)
+        if waited:
+            wait_time = time.monotonic() - start
+            self.stats["waits"] += 1
+            self.stats["wait_time"] += wait_time
+            self.stats["max_wait_time"] = max(self.stats["max_wait_time"],
+                                              wait_time)
+        return PooledConnection(self, connection)
+
+    def _exhausted_message(self) -> str:
+        """Describes the checkouts holding the pool; caller holds the lock."""
+        if not self._checked_out:
+            return "connection pool exhausted"
+        now = time.monotonic()
+        since, thread = min(self._checked_out.values())
+        return (f"connection pool exhausted: {len(self._checked_out)} "
+                f"connections checked out, the oldest for "
+                f"{now - since:.1f}s by thread {thread}; "
+                f"a caller may not be closing its connection")
+
+    def _discard(self, connection) -> None:
+        """Closes a connection and frees its slot; caller holds the lock."""
+        self._open -= 1
+        self.stats["discarded"] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def release(self, connection) -> None:
+        """
+        Takes back a borrowed connection, rolling back whatever
+        transaction the borrower left open; a connection that fails to
+        roll back is discarded.
+
+        Args:
+            connection: Underlying DB-API connection
+        """
+        try:
+            connection.rollback()
+            clean = True
+        except Exception:
+            clean = False
+        with self._cond:
+            self._checked_out.pop(id(connection), None)
+            if not clean or len(self._idle) >= self.size:
+                self._discard(connection)
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Closes every idle connection."""
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+    def metrics(self) -> dict:
+        """
+        Returns a snapshot of the pool metrics.
+
+        Returns:
+            Dictionary of counters plus open, idle and in-use connections
+        """
+        with self._cond:
+            metrics = dict(self.stats)
+            metrics["open"] = self._open
+            metrics["idle"] = len(self._idle)
+            metrics["in_use"] = self._open - len(self._idle)
+        return metrics
+
+
+POOL_TIMEOUT = float(os.environ.get("PERSONAL_DATA_DB_POOL_TIMEOUT", "30"))
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Returns the shared MySQL connection pool, created on first use from
+    the PERSONAL_DATA_DB_* environment variables.
+
+    Returns:
+        ConnectionPool: Pool used by get_db()
+    """
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                config = {
+                    "user": os.environ.get("PERSONAL_DATA_DB_USERNAME",
+                                           "root"),
+                    "password": os.environ.get("PERSONAL_DATA_DB_PASSWORD",
+                                               ""),
+                    "host": os.environ.get("PERSONAL_DATA_DB_HOST",
+                                           "localhost"),
+                    "database": os.environ.get("PERSONAL_DATA_DB_NAME"),
+                }
+                _POOL = ConnectionPool(
+                    lambda: mysql.connector.connect(**config))
+    return _POOL
+
+
+def get_db() -> mysql.connector.connection.MySQLConnection:
     """
-    username = os.environ.get("PERSONAL_DATA_DB_USERNAME", "root")
-    password = os.environ.get("PERSONAL_DATA_DB_PASSWORD", "")
-    host = os.environ.get("PERSONAL_DATA_DB_HOST", "localhost")
-    db_name = os.environ.get("PERSONAL_DATA_DB_NAME")
+    Borrows a MySQL connection from the shared pool.
 
-    connection = mysql.connector.connect(
-        user=username,
-        password=password,
-        host=host,
-        database=db_name
-    )
+    The connection behaves like a MySQLConnection; closing it returns
+    it to the pool instead of disconnecting.
+
+    Returns:
+        mysql.connector.connection.MySQLConnection: Database connection object
 
-    return connection
+    Raises:
+        TimeoutError: If the pool stayed exhausted for POOL_TIMEOUT seconds
+    """
+    return get_pool().acquire(timeout=POOL_TIMEOUT)
 
 
 def main() -> None:
@@ -117,5 +592,64 @@ def main() -> None:
     db.close()
 
 
+def export_users(db=None, stream=None, batch_size: int = BATCH_SIZE,
+                 fields: Tuple[str, ...] = PII_FIELDS) -> Tuple[int, float]:
+    """
+    Streams the users table to a stream in redacted batches.
+
+    Rows are pulled from an unbuffered cursor with fetchmany, so memory
+    stays bounded by batch_size whatever the size of the table.
+
+    Args:
+        db: Database connection, a new one from get_db() if None
+        stream: Writable text stream, sys.stderr if None
+        batch_size: Number of rows fetched, redacted and written at once
+        fields: Tuple of strings representing fields to obfuscate
+
+    Returns:
+        Tuple of the number of rows exported and the rows per second
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be positive")
+    own_db = db is None
+    if own_db:
+        db = get_db()
+    if stream is None:
+        stream = sys.stderr
+    formatter = RedactingFormatter(list(fields))
+    redactor = get_redactor(tuple(fields), formatter.REDACTION,
+                            formatter.SEPARATOR)
+    rows = 0
+    start = time.perf_counter()
+    cursor = db.cursor(buffered=False)
+    try:
+        cursor.execute("SELECT * FROM users;")
+        columns = tuple(f"{column}=" for column in cursor.column_names)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            record = logging.LogRecord("user_data", logging.INFO, __file__,
+                                       0, "", None, None)
+            prefix = formatter.format(record)
+            messages = [prefix + "; ".join(
+                f"{column}{value}" for column, value in zip(columns, row))
+                for row in batch]
+            stream.write(redactor.redact_many(messages) + "\n")
+            rows += len(batch)
+        stream.flush()
+    finally:
+        cursor.close()
+        if own_db:
+            db.close()
+    elapsed = time.perf_counter() - start
+    return rows, rows / elapsed if elapsed > 0 else float(rows)
+
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "--export":
+        size = int(sys.argv[2]) if len(sys.argv) > 2 else BATCH_SIZE
+        count, rate = export_users(batch_size=size)
+        print(f"exported {count} rows ({rate:.0f} rows/s)", file=sys.stderr)
+    else:
+        main()
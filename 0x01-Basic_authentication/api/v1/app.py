@@ -7,7 +7,7 @@ from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
 import os
-from api.v1.auth.auth import Auth
+from api.v1.auth.auth import Auth, PathMatcher
 from api.v1.auth.basic_auth import BasicAuth
 
 
@@ -21,6 +21,10 @@ if auth_type == 'auth':
 elif auth_type == 'basic_auth':
     auth = BasicAuth()
 
+EXCLUDED_PATHS = PathMatcher(['/api/v1/status/',
+                              '/api/v1/unauthorized/',
+                              '/api/v1/forbidden/'])
+
 
 @app.errorhandler(404)
 def not_found(error) -> str:
@@ -50,11 +54,7 @@ def before_request():
     if auth is None:
         return
 
-    excluded_paths = ['/api/v1/status/',
-                      '/api/v1/unauthorized/',
-                      '/api/v1/forbidden/']
-
-    if not auth.require_auth(request.path, excluded_paths):
+    if not auth.require_auth(request.path, EXCLUDED_PATHS):
         return
 
     if auth.authorization_header(request) is None:
@@ -2,27 +2,72 @@
 """Authentication module for the API.
 """
 from flask import request
+from functools import lru_cache
 from typing import List, TypeVar
 
 
+class PathMatcher:
+    """Excluded paths compiled once: a set of exact paths plus a prefix
+    trie for the paths ending with '*', with an LRU of recent decisions.
+    """
+
+    def __init__(self, excluded_paths: List[str], cache_size: int = 1024):
+        """Compile the excluded paths."""
+        self.excluded_paths = tuple(excluded_paths)
+        self._exact = set()
+        self._trie = {}
+        for excluded_path in self.excluded_paths:
+            if excluded_path.endswith('*'):
+                node = self._trie
+                for char in excluded_path[:-1]:
+                    node = node.setdefault(char, {})
+                node[None] = True
+            else:
+                self._exact.add(excluded_path.rstrip('/'))
+        self.is_excluded = lru_cache(maxsize=cache_size)(self._is_excluded)
+
+    def __len__(self) -> int:
+        """Number of excluded paths."""
+        return len(self.excluded_paths)
+
+    def _is_excluded(self, path: str) -> bool:
+        """Check if a path is excluded, in O(len(path))."""
+        path = path.rstrip('/')
+        if path in self._exact:
+            return True
+        node = self._trie
+        if None in node:
+            return True
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                return False
+            if None in node:
+                return True
+        return False
+
+
 class Auth:
     """Auth class to manage API authentication."""
 
+    _matchers = {}
+
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
-        """Check if authentication is required for the given path."""
+        """Check if authentication is required for the given path.
+
+        excluded_paths is either a PathMatcher or a list, compiled on
+        first use and reused for the same paths.
+        """
         if path is None or excluded_paths is None or not excluded_paths:
             return True
 
-        path = path.rstrip('/')
-
-        for excluded_path in excluded_paths:
-            if excluded_path.endswith('*'):
-                if path.startswith(excluded_path[:-1]):
-                    return False
-            elif path == excluded_path.rstrip('/'):
-                return False
+        if not isinstance(excluded_paths, PathMatcher):
+            key = tuple(excluded_paths)
+            if key not in self._matchers:
+                self._matchers[key] = PathMatcher(excluded_paths)
+            excluded_paths = self._matchers[key]
 
-        return True
+        return not excluded_paths.is_excluded(path)
 
     def authorization_header(self, request=None) -> str:
         """Get the Authorization header from the request."""
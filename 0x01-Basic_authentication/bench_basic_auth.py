@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+""" Microbenchmark of Basic header parsing: the three-step
+extract/decode/split chain against parse_basic_authorization
+"""
+import base64
+import timeit
+from api.v1.auth.basic_auth import parse_basic_authorization
+
+
+def legacy_parse(authorization_header: str) -> (str, str):
+    """ Three-step parsing as BasicAuth.current_user used to do it
+    """
+    if authorization_header is None or not isinstance(authorization_header,
+                                                      str):
+        return None, None
+    if not authorization_header.startswith("Basic "):
+        return None, None
+    try:
+        decoded = base64.b64decode(authorization_header[6:]).decode('utf-8')
+    except Exception:
+        return None, None
+    if ':' not in decoded:
+        return None, None
+    credentials = decoded.split(':', 1)
+    return credentials[0], credentials[1]
+
+
+HEADERS = {
+    'valid': "Basic " + base64.b64encode(
+        b"bob@hbtn.io:H0lbertonSchool98!").decode(),
+    'no colon': "Basic " + base64.b64encode(b"bob@hbtn.io").decode(),
+    'bad base64': "Basic Ym9iQGhidG4uaW8=x!",
+    'wrong scheme': "Bearer Ym9iQGhidG4uaW8=",
+}
+
+
+if __name__ == "__main__":
+    number = 200000
+    for name, header in HEADERS.items():
+        assert legacy_parse(header) == parse_basic_authorization(header)
+        legacy = timeit.timeit(lambda: legacy_parse(header), number=number)
+        fused = timeit.timeit(lambda: parse_basic_authorization(header),
+                              number=number)
+        print("{:<13} legacy {:6.0f} ns  fused {:6.0f} ns  x{:.2f}".format(
+            name, legacy / number * 1e9, fused / number * 1e9,
+            legacy / fused))
@@ -2,9 +2,10 @@
 """
 Route module for the API
 """
-from os import getenv
+from api.v1.config import CONFIG
 from api.v1.views import app_views
-from flask import Flask, jsonify, abort, request
+from api.v1.auth.auth import PathMatcher
+from flask import Flask, jsonify, abort, request, g
 from flask_cors import (CORS, cross_origin)
 import os
 
@@ -13,7 +14,7 @@ app = Flask(__name__)
 app.register_blueprint(app_views)
 CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
 auth = None
-AUTH_TYPE = getenv("AUTH_TYPE")
+AUTH_TYPE = CONFIG.auth_type
 
 if AUTH_TYPE == "auth":
     from api.v1.auth.auth import Auth
@@ -31,6 +32,11 @@ elif AUTH_TYPE == "session_db_auth":
     from api.v1.auth.session_db_auth import SessionDBAuth
     auth = SessionDBAuth()
 
+EXCLUDED_PATHS = PathMatcher(['/api/v1/status/',
+                              '/api/v1/unauthorized/',
+                              '/api/v1/forbidden/',
+                              '/api/v1/auth_session/login/'])
+
 
 @app.errorhandler(404)
 def not_found(error) -> str:
@@ -57,28 +63,25 @@ def forbidden(error) -> str:
 def before_request() -> str:
     """ Before Request Handler
     Requests Validation
+
+    The credentials are read once and the resolved user is kept on
+    request.current_user and g.current_user for the rest of the request.
     """
+    request.current_user = g.current_user = None
     if auth is None:
         return
 
-    excluded_paths = ['/api/v1/status/',
-                      '/api/v1/unauthorized/',
-                      '/api/v1/forbidden/',
-                      '/api/v1/auth_session/login/']
-
-    if not auth.require_auth(request.path, excluded_paths):
+    if not auth.require_auth(request.path, EXCLUDED_PATHS):
         return
 
     if auth.authorization_header(request) is None \
             and auth.session_cookie(request) is None:
         abort(401)
 
-    request.current_user = auth.current_user(request)
+    request.current_user = g.current_user = auth.current_user(request)
     if request.current_user is None:
         abort(403)
 
 
 if __name__ == "__main__":
-    host = getenv("API_HOST", "0.0.0.0")
-    port = getenv("API_PORT", "5000")
-    app.run(host=host, port=port)
+    app.run(host=CONFIG.api_host, port=CONFIG.api_port)
@@ -3,39 +3,96 @@
 Authentication module for the API
 """
 from flask import request
+from functools import lru_cache
 from typing import List, TypeVar
-from os import getenv
+from api.v1.config import CONFIG
+
+
+def _memoize_on_request(request, name: str, compute):
+    """Compute a per-request value once and keep it on the request"""
+    cache = vars(request)
+    if name not in cache:
+        cache[name] = compute()
+    return cache[name]
+
+
+class PathMatcher:
+    """Excluded paths compiled once: a set of exact paths plus a prefix
+    trie for the paths ending with '*', with an LRU of recent decisions
+    """
+
+    def __init__(self, excluded_paths: List[str], cache_size: int = 1024):
+        """Compile the excluded paths"""
+        self.excluded_paths = tuple(excluded_paths)
+        self._exact = set()
+        self._trie = {}
+        for excluded_path in self.excluded_paths:
+            if excluded_path.endswith('*'):
+                node = self._trie
+                for char in excluded_path[:-1]:
+                    node = node.setdefault(char, {})
+                node[None] = True
+            else:
+                self._exact.add(excluded_path)
+        self.is_excluded = lru_cache(maxsize=cache_size)(self._is_excluded)
+
+    def __len__(self) -> int:
+        """Number of excluded paths"""
+        return len(self.excluded_paths)
+
+    def _is_excluded(self, path: str) -> bool:
+        """Check if a path is excluded, in O(len(path))"""
+        if path[-1] != '/':
+            path += '/'
+        if path in self._exact:
+            return True
+        node = self._trie
+        if None in node:
+            return True
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                return False
+            if None in node:
+                return True
+        return False
 
 
 class Auth:
     """Auth class to manage API authentication"""
+    _matchers = {}
+
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
-        """Check if authentication is required"""
+        """Check if authentication is required
+
+        excluded_paths is either a PathMatcher or a list, compiled on
+        first use and reused for the same paths.
+        """
         if path is None or excluded_paths is None or not excluded_paths:
             return True
-        if path[-1] != '/':
-            path += '/'
-        for excluded_path in excluded_paths:
-            if excluded_path.endswith('*'):
-                if path.startswith(excluded_path[:-1]):
-                    return False
-            elif path == excluded_path:
-                return False
-        return True
+        if not isinstance(excluded_paths, PathMatcher):
+            key = tuple(excluded_paths)
+            if key not in self._matchers:
+                self._matchers[key] = PathMatcher(excluded_paths)
+            excluded_paths = self._matchers[key]
+        return not excluded_paths.is_excluded(path)
 
     def authorization_header(self, request=None) -> str:
-        """Get the Authorization header from the request"""
+        """Get the Authorization header from the request, read once"""
         if request is None:
             return None
-        return request.headers.get('Authorization')
+        return _memoize_on_request(
+            request, '_authorization_header',
+            lambda: request.headers.get('Authorization'))
 
     def current_user(self, request=None) -> TypeVar('User'):
         """Get the current user"""
         return None
 
     def session_cookie(self, request=None):
-        """Get the session cookie value from a request"""
+        """Get the session cookie value from a request, read once"""
         if request is None:
             return None
-        session_name = getenv('SESSION_NAME')
-        return request.cookies.get(session_name)
+        return _memoize_on_request(
+            request, '_session_cookie',
+            lambda: request.cookies.get(CONFIG.session_name))
@@ -3,25 +3,136 @@
 BasicAuth module for the API
 """
 from api.v1.auth.auth import Auth
-import base64
-from typing import TypeVar
+import binascii
+from typing import Tuple, TypeVar
 from models.user import User
+from collections import OrderedDict
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+
+def _basic_payload(authorization_header: str) -> str:
+    """Return the Base64 part of a Basic header, None if not Basic"""
+    if not isinstance(authorization_header, str) or \
+            not authorization_header.startswith('Basic '):
+        return None
+    return authorization_header[6:]
+
+
+def _decode_payload(payload: str) -> bytes:
+    """Decode a Base64 payload to bytes, None if malformed"""
+    try:
+        return binascii.a2b_base64(payload)
+    except ValueError:
+        return None
+
+
+def _split_credentials(decoded: bytes) -> Tuple[str, str]:
+    """Split decoded 'email:password' bytes on the first colon
+
+    Returns (None, None) without a colon or on invalid UTF-8.
+    """
+    email, colon, pwd = decoded.partition(b':')
+    if not colon:
+        return None, None
+    try:
+        return email.decode('utf-8'), pwd.decode('utf-8')
+    except UnicodeDecodeError:
+        return None, None
+
+
+def parse_basic_authorization(authorization_header: str
+                              ) -> Tuple[str, str]:
+    """Parse a 'Basic <base64 of email:password>' header in one pass
+
+    Chains the primitives the BasicAuth helpers wrap, but stays on bytes
+    until the split, so no intermediate strings are built. Returns
+    (None, None) whenever the header is not valid Basic credentials.
+    """
+    payload = _basic_payload(authorization_header)
+    if payload is None:
+        return None, None
+    decoded = _decode_payload(payload)
+    if decoded is None:
+        return None, None
+    return _split_credentials(decoded)
+
+
+class CredentialCache:
+    """Bounded LRU of verified Authorization headers
+
+    Headers are keyed by an HMAC digest under a per-process key, so the
+    cache never holds credentials. A hit is only served while the user
+    still exists with the password hash it was verified against, so
+    changing the password or deleting the user invalidates it.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0):
+        """Initialize an empty cache"""
+        self.max_size = max_size
+        self.ttl = ttl
+        self._key = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _digest(self, authorization_header: str) -> bytes:
+        """Keyed digest of an Authorization header"""
+        return hmac.new(self._key, authorization_header.encode('utf-8'),
+                        hashlib.sha256).digest()
+
+    def get(self, authorization_header: str) -> TypeVar('User'):
+        """Return the cached User for a header, None on a miss"""
+        digest = self._digest(authorization_header)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                user_id, password, expires_at = entry
+                user = User.get(user_id)
+                if expires_at > time.monotonic() and user is not None \
+                        and user.password == password:
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    return user
+                del self._entries[digest]
+            self.misses += 1
+        return None
+
+    def put(self, authorization_header: str, user: TypeVar('User')):
+        """Remember the User a header was verified for"""
+        digest = self._digest(authorization_header)
+        with self._lock:
+            self._entries[digest] = (user.id, user.password,
+                                     time.monotonic() + self.ttl)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Hit and miss counters"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self._entries)}
 
 
 class BasicAuth(Auth):
     """BasicAuth class"""
+
+    def __init__(self):
+        """Initialize BasicAuth with an empty credential cache"""
+        self.credential_cache = CredentialCache()
+
     def extract_base64_authorization_header(self,
                                             authorization_header: str) -> str:
         """
         Extract the Base64 part of the Authorization header
         for a Basic Authentication
         """
-        if authorization_header is None or \
-           not isinstance(authorization_header, str):
-            return None
-        if not authorization_header.startswith('Basic '):
-            return None
-        return authorization_header[6:]
+        return _basic_payload(authorization_header)
 
     def decode_base64_authorization_header(self,
                                            base64_authorization_header: str
@@ -32,10 +143,12 @@ class BasicAuth(Auth):
         if base64_authorization_header is None or \
            not isinstance(base64_authorization_header, str):
             return None
+        decoded = _decode_payload(base64_authorization_header)
+        if decoded is None:
+            return None
         try:
-            decoded = base64.b64decode(base64_authorization_header)
             return decoded.decode('utf-8')
-        except Exception:
+        except UnicodeDecodeError:
             return None
 
     def extract_user_credentials(self,
@@ -47,9 +160,11 @@ class BasicAuth(Auth):
         if decoded_base64_authorization_header is None or \
            not isinstance(decoded_base64_authorization_header, str):
             return None, None
-        if ':' not in decoded_base64_authorization_header:
+        try:
+            decoded = decoded_base64_authorization_header.encode('utf-8')
+        except UnicodeEncodeError:
             return None, None
-        return tuple(decoded_base64_authorization_header.split(':', 1))
+        return _split_credentials(decoded)
 
     def user_object_from_credentials(self, user_email: str,
                                      user_pwd: str) -> TypeVar('User'):
@@ -76,13 +191,13 @@ class BasicAuth(Auth):
         auth_header = self.authorization_header(request)
         if auth_header is None:
             return None
-        base64_auth = self.extract_base64_authorization_header(auth_header)
-        if base64_auth is None:
-            return None
-        decoded_auth = self.decode_base64_authorization_header(base64_auth)
-        if decoded_auth is None:
-            return None
-        email, pwd = self.extract_user_credentials(decoded_auth)
+        user = self.credential_cache.get(auth_header)
+        if user is not None:
+            return user
+        email, pwd = parse_basic_authorization(auth_header)
         if email is None or pwd is None:
             return None
-        return self.user_object_from_credentials(email, pwd)
+        user = self.user_object_from_credentials(email, pwd)
+        if user is not None:
+            self.credential_cache.put(auth_header, user)
+        return user
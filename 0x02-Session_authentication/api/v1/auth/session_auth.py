@@ -3,6 +3,7 @@
 SessionAuth module for the API
 """
 from api.v1.auth.auth import Auth
+from api.v1.auth.session_store import get_session_store
 import uuid
 from models.user import User
 
@@ -10,6 +11,19 @@ from models.user import User
 class SessionAuth(Auth):
     """SessionAuth class"""
     user_id_by_session_id = {}
+    default_session_store = 'memory'
+    session_duration = 0
+
+    def __init__(self):
+        """Initialize SessionAuth with the store named by SESSION_STORE
+
+        The memory store keeps its sessions in the class-level
+        user_id_by_session_id dict; sessions expire after
+        session_duration seconds when it is positive.
+        """
+        self.session_store = get_session_store(
+            self.default_session_store, ttl=self.session_duration,
+            data=self.user_id_by_session_id)
 
     def create_session(self, user_id: str = None) -> str:
         """
@@ -18,7 +32,7 @@ class SessionAuth(Auth):
         if user_id is None or not isinstance(user_id, str):
             return None
         session_id = str(uuid.uuid4())
-        self.user_id_by_session_id[session_id] = user_id
+        self.session_store.set(session_id, user_id, self.session_duration)
         return session_id
 
     def user_id_for_session_id(self, session_id: str = None) -> str:
@@ -27,7 +41,7 @@ class SessionAuth(Auth):
         """
         if session_id is None or not isinstance(session_id, str):
             return None
-        return self.user_id_by_session_id.get(session_id)
+        return self.session_store.get(session_id)
 
     def current_user(self, request=None):
         """
@@ -51,5 +65,5 @@ class SessionAuth(Auth):
         user_id = self.user_id_for_session_id(session_id)
         if user_id is None:
             return False
-        del self.user_id_by_session_id[session_id]
+        self.session_store.delete(session_id)
         return True
@@ -3,48 +3,12 @@
 SessionDBAuth module for the API
 """
 from api.v1.auth.session_exp_auth import SessionExpAuth
-from models.user_session import UserSession
-from datetime import datetime, timedelta
 
 
 class SessionDBAuth(SessionExpAuth):
-    """SessionDBAuth class"""
+    """SessionDBAuth class
 
-    def create_session(self, user_id=None):
-        """Create and store new instance of UserSession"""
-        session_id = super().create_session(user_id)
-        if session_id is None:
-            return None
-        user_session = UserSession(user_id=user_id, session_id=session_id)
-        user_session.save()
-        return session_id
-
-    def user_id_for_session_id(self, session_id=None):
-        """Return user_id from the UserSession instance"""
-        if session_id is None:
-            return None
-        UserSession.load_from_file()
-        user_sessions = UserSession.search({'session_id': session_id})
-        if not user_sessions:
-            return None
-        user_session = user_sessions[0]
-        expired_time = user_session.created_at + \
-            timedelta(seconds=self.session_duration)
-        if expired_time < datetime.now():
-            return None
-        return user_session.user_id
-
-    def destroy_session(self, request=None):
-        """Destroy the UserSession based on the Session ID"""
-        if request is None:
-            return False
-        session_id = self.session_cookie(request)
-        if session_id is None:
-            return False
-        user_id = self.user_id_for_session_id(session_id)
-        if user_id is None:
-            return False
-        user_sessions = UserSession.search({'session_id': session_id})
-        if user_sessions:
-            user_sessions[0].remove()
-        return True
+    Sessions are stored as UserSession objects by the file session
+    store unless SESSION_STORE names another backend.
+    """
+    default_session_store = 'file'
@@ -3,8 +3,9 @@
 SessionExpAuth module for the API
 """
 from api.v1.auth.session_auth import SessionAuth
-from os import getenv
-from datetime import datetime, timedelta
+from api.v1.config import CONFIG
+import threading
+import time
 
 
 class SessionExpAuth(SessionAuth):
@@ -12,37 +13,46 @@ class SessionExpAuth(SessionAuth):
 
     def __init__(self):
         """Initialize SessionExpAuth"""
+        self.session_duration = CONFIG.session_duration
         super().__init__()
-        try:
-            self.session_duration = int(getenv('SESSION_DURATION', 0))
-        except ValueError:
-            self.session_duration = 0
-
-    def create_session(self, user_id=None):
-        """Create a Session ID with expiration"""
-        session_id = super().create_session(user_id)
-        if session_id is None:
-            return None
-        session_dictionary = {
-            "user_id": user_id,
-            "created_at": datetime.now()
-        }
-        self.user_id_by_session_id[session_id] = session_dictionary
-        return session_id
+        self.reap_interval = CONFIG.session_reap_interval
+        self._next_reap = time.monotonic() + self.reap_interval
+        self._reaper = None
+        self.reaper_stats = {'runs': 0, 'evicted': 0}
 
     def user_id_for_session_id(self, session_id=None):
-        """Return user_id from session dictionary"""
+        """Return user_id of a session the store has not expired"""
         if session_id is None:
             return None
-        session_dictionary = self.user_id_by_session_id.get(session_id)
-        if session_dictionary is None:
-            return None
-        if self.session_duration <= 0:
-            return session_dictionary.get('user_id')
-        created_at = session_dictionary.get('created_at')
-        if created_at is None:
-            return None
-        expired_time = created_at + timedelta(seconds=self.session_duration)
-        if expired_time < datetime.now():
-            return None
-        return session_dictionary.get('user_id')
+        self._maybe_reap()
+        return super().user_id_for_session_id(session_id)
+
+    def reap_expired_sessions(self) -> int:
+        """Evict every expired session from the store"""
+        evicted = self.session_store.reap()
+        self.reaper_stats['runs'] += 1
+        self.reaper_stats['evicted'] += evicted
+        return evicted
+
+    def _maybe_reap(self):
+        """Piggyback a reaper run on a request every reap_interval"""
+        if self._reaper is not None or self.reap_interval <= 0:
+            return
+        now = time.monotonic()
+        if now < self._next_reap:
+            return
+        self._next_reap = now + self.reap_interval
+        self.reap_expired_sessions()
+
+    def start_reaper(self):
+        """Run the reaper on a background thread instead of on requests"""
+        if self._reaper is not None or self.reap_interval <= 0:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.reap_interval)
+                self.reap_expired_sessions()
+
+        self._reaper = threading.Thread(target=run, daemon=True)
+        self._reaper.start()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Session store backends for the session authentication classes
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from api.v1.config import CONFIG
+from urllib.parse import urlparse
+from models.base import FILE_STATES
+from models.user_session import UserSession
+import heapq
+import socket
+import sqlite3
+import threading
+import time
+
+
+class SessionStore(ABC):
+    """Interface mapping Session IDs to User IDs with optional TTLs"""
+
+    @abstractmethod
+    def set(self, session_id: str, user_id: str, ttl: int = None) -> None:
+        """Store a session, expiring after ttl seconds if ttl > 0"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, session_id: str) -> str:
+        """Return the User ID of a live session, None otherwise"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Delete a session, returning whether it existed"""
+        raise NotImplementedError
+
+    def reap(self) -> int:
+        """Delete the expired sessions, returning how many were deleted"""
+        return 0
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Process-local store
+
+    Session IDs map to User IDs in data; expiry times are kept apart in
+    a dict plus a min-heap, so reap() evicts in O(log n) per session.
+    """
+
+    def __init__(self, data: dict = None):
+        """Initialize the store over an optional existing dict"""
+        self.data = data if data is not None else {}
+        self._expires = {}
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def set(self, session_id: str, user_id: str, ttl: int = None) -> None:
+        """Store a session, expiring after ttl seconds if ttl > 0"""
+        with self._lock:
+            self.data[session_id] = user_id
+            if ttl is not None and ttl > 0:
+                expires_at = time.time() + ttl
+                self._expires[session_id] = expires_at
+                heapq.heappush(self._heap, (expires_at, session_id))
+            else:
+                self._expires.pop(session_id, None)
+
+    def get(self, session_id: str) -> str:
+        """Return the User ID of a live session, None otherwise"""
+        expires_at = self._expires.get(session_id)
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return self.data.get(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        """Delete a session, returning whether it existed"""
+        with self._lock:
+            self._expires.pop(session_id, None)
+            return self.data.pop(session_id, None) is not None
+
+    def reap(self) -> int:
+        """Delete the expired sessions, returning how many were deleted"""
+        now = time.time()
+        evicted = 0
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, session_id = heapq.heappop(self._heap)
+                if self._expires.get(session_id) != expires_at:
+                    continue
+                del self._expires[session_id]
+                self.data.pop(session_id, None)
+                evicted += 1
+        return evicted
+
+
+class FileSessionStore(SessionStore):
+    """
+    Store persisting sessions as UserSession objects in the JSON files
+
+    UserSession has no expiry field, so every session shares the TTL
+    given to the store. set() pushes its sessions onto the expiry heap
+    and reap() merges the ones replayed from other processes' journal
+    records; the heap is only rebuilt when the files were reloaded or
+    rewritten.
+    """
+
+    def __init__(self, ttl: int = 0):
+        """Initialize the store with the TTL of every session"""
+        self.ttl = ttl
+        self._heap = []
+        self._state = None
+        self._merged = 0
+        self._lock = threading.Lock()
+
+    def _expiry(self, user_session) -> datetime:
+        """Return when a UserSession expires"""
+        return user_session.created_at + timedelta(seconds=self.ttl)
+
+    def set(self, session_id: str, user_id: str, ttl: int = None) -> None:
+        """Store a session; the TTL is the store's own"""
+        user_session = UserSession(user_id=user_id, session_id=session_id)
+        user_session.save()
+        if self.ttl > 0:
+            with self._lock:
+                heapq.heappush(self._heap, (self._expiry(user_session),
+                                            session_id))
+
+    def get(self, session_id: str) -> str:
+        """Return the User ID of a live session, None otherwise"""
+        UserSession.refresh_from_file()
+        user_sessions = UserSession.search({'session_id': session_id})
+        if not user_sessions:
+            return None
+        user_session = user_sessions[0]
+        if self.ttl > 0 and self._expiry(user_session) < datetime.utcnow():
+            return None
+        return user_session.user_id
+
+    def delete(self, session_id: str) -> bool:
+        """Delete a session, returning whether it existed"""
+        UserSession.refresh_from_file()
+        user_sessions = UserSession.search({'session_id': session_id})
+        for user_session in user_sessions:
+            user_session.remove()
+        return len(user_sessions) > 0
+
+    def reap(self) -> int:
+        """Delete the expired sessions, returning how many were deleted"""
+        if self.ttl <= 0:
+            return 0
+        UserSession.refresh_from_file()
+        now = datetime.utcnow()
+        evicted = 0
+        state = FILE_STATES[UserSession.__name__]
+        with self._lock:
+            if self._state is not state:
+                self._state = state
+                self._merged = len(state['replayed'])
+                self._heap = [(self._expiry(user_session),
+                               user_session.session_id)
+                              for user_session in UserSession.all()]
+                heapq.heapify(self._heap)
+            replayed = state['replayed']
+            for obj_id in replayed[self._merged:]:
+                user_session = UserSession.get(obj_id)
+                if user_session is not None:
+                    heapq.heappush(self._heap,
+                                   (self._expiry(user_session),
+                                    user_session.session_id))
+            self._merged = len(replayed)
+            while self._heap and self._heap[0][0] < now:
+                _, session_id = heapq.heappop(self._heap)
+                for user_session in UserSession.search(
+                        {'session_id': session_id}):
+                    if self._expiry(user_session) < now:
+                        user_session.remove()
+                        evicted += 1
+        return evicted
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Store shared by every process on a host through one SQLite file
+
+    Each thread gets its own connection; WAL mode lets readers run
+    while a writer commits.
+    """
+
+    def __init__(self, file_path: str = ".db_sessions.sqlite"):
+        """Initialize the store, creating its table if needed"""
+        self.file_path = file_path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS sessions ("
+                           "session_id TEXT PRIMARY KEY, "
+                           "user_id TEXT NOT NULL, "
+                           "expires_at REAL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS "
+                           "sessions_expires_at ON sessions (expires_at)")
+        connection.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the connection of the current thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.file_path, timeout=30)
+            self._local.connection = connection
+        return connection
+
+    def set(self, session_id: str, user_id: str, ttl: int = None) -> None:
+        """Store a session, expiring after ttl seconds if ttl > 0"""
+        expires_at = time.time() + ttl if ttl is not None and ttl > 0 \
+            else None
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO sessions "
+                               "VALUES (?, ?, ?)",
+                               (session_id, user_id, expires_at))
+
+    def get(self, session_id: str) -> str:
+        """Return the User ID of a live session, None otherwise"""
+        row = self._connection().execute(
+            "SELECT user_id FROM sessions WHERE session_id = ? "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (session_id, time.time())).fetchone()
+        return row[0] if row is not None else None
+
+    def delete(self, session_id: str) -> bool:
+        """Delete a session, returning whether it existed"""
+        with self._connection() as connection:
+            cursor = connection.execute(
+                "DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def reap(self) -> int:
+        """Delete the expired sessions, returning how many were deleted"""
+        with self._connection() as connection:
+            cursor = connection.execute(
+                "DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Networked store speaking the Redis protocol (RESP)
+
+    Works against Redis or any server implementing SET with EX, GET and
+    DEL; expiry is left to the server.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0",
+                 prefix: str = "session:", timeout: float = 5.0):
+        """Initialize the store; the connection opens on first use"""
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.password = parsed.password
+        self.prefix = prefix
+        self.timeout = timeout
+        self._socket = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open the connection, authenticating and selecting the db"""
+        self._socket = socket.create_connection((self.host, self.port),
+                                                self.timeout)
+        self._reader = self._socket.makefile('rb')
+        if self.password:
+            self._send('AUTH', self.password)
+        if self.db:
+            self._send('SELECT', self.db)
+
+    def _send(self, *args):
+        """Send one command and return its decoded reply"""
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = str(arg).encode('utf-8')
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._socket.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        """Decode one RESP reply"""
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("connection closed by the server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode('utf-8')
+        if kind == b"-":
+            raise RuntimeError(payload.decode('utf-8'))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2].decode('utf-8')
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise ConnectionError("unexpected reply: {!r}".format(line))
+
+    def _command(self, *args):
+        """Run a command, reconnecting once if the connection dropped"""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._socket is None:
+                        self._connect()
+                    return self._send(*args)
+                except (OSError, ConnectionError):
+                    self._close()
+                    if attempt:
+                        raise
+
+    def _close(self):
+        """Drop the connection"""
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+        self._socket = None
+        self._reader = None
+
+    def set(self, session_id: str, user_id: str, ttl: int = None) -> None:
+        """Store a session, expiring after ttl seconds if ttl > 0"""
+        key = self.prefix + session_id
+        if ttl is not None and ttl > 0:
+            self._command('SET', key, user_id, 'EX', ttl)
+        else:
+            self._command('SET', key, user_id)
+
+    def get(self, session_id: str) -> str:
+        """Return the User ID of a live session, None otherwise"""
+        return self._command('GET', self.prefix + session_id)
+
+    def delete(self, session_id: str) -> bool:
+        """Delete a session, returning whether it existed"""
+        return self._command('DEL', self.prefix + session_id) > 0
+
+
+_MEMORY_STORES = {}
+
+
+def get_session_store(default: str = 'memory', ttl: int = 0,
+                      data: dict = None) -> SessionStore:
+    """
+    Build the store named by SESSION_STORE (memory, file, sqlite or
+    redis), with SESSION_STORE_URL as the SQLite path or Redis URL
+
+    Memory stores over the same data dict are shared, like the dict.
+    """
+    kind = CONFIG.session_store or default
+    url = CONFIG.session_store_url
+    if kind == 'memory':
+        if data is None:
+            return MemorySessionStore()
+        if id(data) not in _MEMORY_STORES:
+            _MEMORY_STORES[id(data)] = MemorySessionStore(data)
+        return _MEMORY_STORES[id(data)]
+    if kind == 'file':
+        return FileSessionStore(ttl)
+    if kind == 'sqlite':
+        return SQLiteSessionStore(url or ".db_sessions.sqlite")
+    if kind == 'redis':
+        return RedisSessionStore(url or "redis://localhost:6379/0")
+    raise ValueError("unknown session store: {}".format(kind))
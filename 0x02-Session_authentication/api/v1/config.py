@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Configuration of the API, read once from the environment
+"""
+from os import getenv
+from typing import NamedTuple
+
+
+def _int_from_env(name: str, default: int) -> int:
+    """Read an integer variable, falling back to default if invalid"""
+    try:
+        return int(getenv(name, default))
+    except ValueError:
+        return default
+
+
+class Config(NamedTuple):
+    """Immutable API configuration"""
+    auth_type: str
+    session_name: str
+    session_duration: int
+    session_reap_interval: int
+    session_store: str
+    session_store_url: str
+    api_host: str
+    api_port: str
+
+    @classmethod
+    def from_env(cls) -> 'Config':
+        """Build the configuration from the environment variables"""
+        return cls(auth_type=getenv('AUTH_TYPE'),
+                   session_name=getenv('SESSION_NAME'),
+                   session_duration=_int_from_env('SESSION_DURATION', 0),
+                   session_reap_interval=_int_from_env(
+                       'SESSION_REAP_INTERVAL', 60),
+                   session_store=getenv('SESSION_STORE'),
+                   session_store_url=getenv('SESSION_STORE_URL'),
+                   api_host=getenv('API_HOST', '0.0.0.0'),
+                   api_port=getenv('API_PORT', '5000'))
+
+
+CONFIG = Config.from_env()
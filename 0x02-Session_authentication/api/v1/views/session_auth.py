@@ -5,7 +5,7 @@ Session authentication views
 from api.v1.views import app_views
 from flask import abort, jsonify, request
 from models.user import User
-from os import getenv
+from api.v1.config import CONFIG
 
 
 @app_views.route('/auth_session/login', methods=['POST'], strict_slashes=False)
@@ -34,8 +34,7 @@ def login():
             from api.v1.app import auth
             session_id = auth.create_session(user.id)
             response = jsonify(user.to_json())
-            session_name = getenv('SESSION_NAME')
-            response.set_cookie(session_name, session_id)
+            response.set_cookie(CONFIG.session_name, session_id)
             return response
 
     return jsonify({"error": "wrong password"}), 401
@@ -2,18 +2,76 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import (abort, jsonify, request, Response, stream_with_context)
 from models.user import User
+import json
+
+STREAM_PAGE_SIZE = 1000
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters:
+      - limit (optional): page size, every User if missing
+      - after (optional): ID of the last User of the previous page
+      - format (optional): "ndjson" to stream one User per line, or
+        "stream" to stream the JSON list in chunks
     Return:
-      - list of all User objects JSON represented
+      - list of all User objects JSON represented, ordered by ID when
+        limit or after is given, with the next `after` in X-Next-Cursor
+      - 400 if limit isn't a positive integer or format is unknown
+    """
+    fmt = request.args.get('format')
+    if fmt is not None:
+        if fmt not in ('ndjson', 'stream'):
+            return jsonify({'error': "Unknown format"}), 400
+        return _stream_users(fmt)
+    after = request.args.get('after')
+    limit = request.args.get('limit')
+    if limit is None and after is None:
+        all_users = [user.to_json() for user in User.all()]
+        return jsonify(all_users)
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return jsonify({'error': "limit must be a positive integer"}), 400
+    users = User.page(after, limit)
+    response = jsonify([user.to_json() for user in users])
+    if limit is not None and len(users) == limit:
+        response.headers['X-Next-Cursor'] = users[-1].id
+    return response
+
+
+def _stream_users(fmt: str) -> Response:
+    """ Stream every User in ID order, one page at a time, as NDJSON or
+    as a chunked JSON list
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    def generate():
+        after = None
+        first = True
+        if fmt == 'stream':
+            yield '['
+        while True:
+            users = User.page(after, STREAM_PAGE_SIZE)
+            if not users:
+                break
+            for user in users:
+                if fmt == 'ndjson':
+                    yield json.dumps(user.to_json()) + '\n'
+                else:
+                    yield ('' if first else ',') + json.dumps(user.to_json())
+                first = False
+            after = users[-1].id
+        if fmt == 'stream':
+            yield ']\n'
+
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' \
+        else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
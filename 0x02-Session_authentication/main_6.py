@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+""" Main 6
+"""
+import socket
+import socketserver
+import threading
+import time
+from api.v1.auth.session_store import RedisSessionStore
+
+KEYS = {}
+
+
+class RESPHandler(socketserver.StreamRequestHandler):
+    """ Minimal Redis stand-in: SET with EX, GET and DEL
+    """
+
+    def read_command(self) -> list:
+        """ Read one array of bulk strings, None at end of stream
+        """
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2].decode('utf-8'))
+        return args
+
+    def handle(self):
+        """ Answer commands until the client hangs up
+        """
+        self.server.clients.append(self.connection)
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            name = args[0].upper()
+            if name == 'SET':
+                expires_at = None
+                if len(args) == 5 and args[3].upper() == 'EX':
+                    expires_at = time.time() + int(args[4])
+                KEYS[args[1]] = (args[2], expires_at)
+                reply = b"+OK\r\n"
+            elif name == 'GET':
+                value, expires_at = KEYS.get(args[1], (None, None))
+                if expires_at is not None and expires_at <= time.time():
+                    del KEYS[args[1]]
+                    value = None
+                if value is None:
+                    reply = b"$-1\r\n"
+                else:
+                    data = value.encode('utf-8')
+                    reply = b"$%d\r\n%s\r\n" % (len(data), data)
+            elif name == 'DEL':
+                reply = b":%d\r\n" % (KEYS.pop(args[1], None) is not None)
+            else:
+                reply = b"-ERR unknown command\r\n"
+            self.wfile.write(reply)
+
+
+def start_server(port: int = 0) -> socketserver.ThreadingTCPServer:
+    """ Serve RESP on localhost in a background thread
+    """
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", port),
+                                             RESPHandler)
+    server.daemon_threads = True
+    server.clients = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stop_server(server: socketserver.ThreadingTCPServer):
+    """ Stop a server and drop every client connection
+    """
+    server.shutdown()
+    server.server_close()
+    for connection in server.clients:
+        try:
+            connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+server = start_server()
+port = server.server_address[1]
+store = RedisSessionStore("redis://127.0.0.1:{}/0".format(port))
+
+store.set("abcde", "user_1")
+store.set("fghij", "user_2", ttl=1)
+print("abcde => {}".format(store.get("abcde")))
+print("fghij => {}".format(store.get("fghij")))
+
+print("---")
+
+time.sleep(1.5)
+print("fghij after 1.5 seconds => {}".format(store.get("fghij")))
+
+print("---")
+
+stop_server(server)
+server = start_server(port)
+print("abcde after a server restart => {}".format(store.get("abcde")))
+print("delete abcde: {}".format(store.delete("abcde")))
+print("delete abcde again: {}".format(store.delete("abcde")))
+print("abcde => {}".format(store.get("abcde")))
+
+stop_server(server)
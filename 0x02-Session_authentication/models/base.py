@@ -2,37 +2,124 @@
 """
 Base module
 """
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import TypeVar, List, Iterable
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
 from os import path
+import atexit
+import calendar
+import fcntl
+import gc
 import json
+import os
+import threading
+import time
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+EPOCH = datetime(1970, 1, 1)
+_UNSET = object()
+MONTH_DAYS = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
 DATA = {}
+INDEXES = {}
+INDEXED_VALUES = {}
+JOURNAL_SIZES = {}
+SORTED_IDS = {}
+LOAD_STATS = {}
+FILE_STATES = {}
+JOURNAL_MAX_RECORDS = 1000
+GROUP_COMMIT = {'interval': 0, 'batch_size': 100}
+_PENDING = []
+_SEQUENCE = {'queued': 0, 'flushed': 0}
+_COMMIT = threading.Condition()
+_WRITE_LOCK = threading.RLock()
+_FLUSHER = []
+_FILE_LOCKS = {}
+ATTRIBUTE_NAMES = {}
 
 
 class Base():
     """Base class"""
 
+    __slots__ = ('id', '_created_at', '_updated_at')
+    indexed_attributes = ()
+
     def __init__(self, *args: list, **kwargs: dict):
         """Initialize a Base instance"""
         s_class = str(self.__class__.__name__)
         if DATA.get(s_class) is None:
             DATA[s_class] = {}
 
-        self.id = kwargs.get('id', str(uuid.uuid4()))
+        self.id = kwargs['id'] if 'id' in kwargs else str(uuid.uuid4())
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self._created_at = _parse_timestamp(kwargs.get('created_at'))
         else:
-            self.created_at = datetime.utcnow()
+            self._created_at = int(time.time())
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self._updated_at = _parse_timestamp(kwargs.get('updated_at'))
+        else:
+            self._updated_at = int(time.time())
+
+    @property
+    def created_at(self) -> datetime:
+        """Creation time, stored as UTC epoch seconds"""
+        return EPOCH + timedelta(seconds=self._created_at)
+
+    @created_at.setter
+    def created_at(self, value: datetime):
+        """Set the creation time from a UTC datetime"""
+        self._created_at = calendar.timegm(value.utctimetuple())
+
+    @property
+    def updated_at(self) -> datetime:
+        """Last update time, stored as UTC epoch seconds"""
+        return EPOCH + timedelta(seconds=self._updated_at)
+
+    @updated_at.setter
+    def updated_at(self, value: datetime):
+        """Set the last update time from a UTC datetime"""
+        self._updated_at = calendar.timegm(value.utctimetuple())
+
+    @classmethod
+    def _attribute_names(cls) -> tuple:
+        """Attribute names in declaration order, slots first"""
+        names = ATTRIBUTE_NAMES.get(cls)
+        if names is None:
+            names = ['id', 'created_at', 'updated_at']
+            for klass in reversed(cls.__mro__):
+                for name in klass.__dict__.get('__slots__', ()):
+                    if name not in Base.__slots__ and name not in names:
+                        names.append(name)
+            names = ATTRIBUTE_NAMES[cls] = tuple(names)
+        return names
+
+    @classmethod
+    def _from_json(cls, obj_json: dict) -> TypeVar('Base'):
+        """Build an object from its to_json(True) form
+
+        Classes declaring __slots__ get their slots filled directly,
+        without running __init__; other classes go through __init__.
+        """
+        if '__slots__' not in cls.__dict__:
+            return cls(**obj_json)
+        obj = cls.__new__(cls)
+        obj.id = obj_json.get('id')
+        created_at = obj_json.get('created_at')
+        updated_at = obj_json.get('updated_at')
+        now = int(time.time())
+        obj._created_at = _parse_timestamp(created_at) \
+            if created_at is not None else now
+        if updated_at == created_at:
+            obj._updated_at = obj._created_at
         else:
-            self.updated_at = datetime.utcnow()
+            obj._updated_at = _parse_timestamp(updated_at) \
+                if updated_at is not None else now
+        for name in cls._attribute_names()[3:]:
+            setattr(obj, name, obj_json.get(name))
+        return obj
 
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """Equality"""
@@ -45,54 +132,279 @@ class Base():
     def to_json(self, for_serialization: bool = False) -> dict:
         """Convert the object a JSON dictionary"""
         result = {}
-        for key, value in self.__dict__.items():
+        names = self._attribute_names()
+        if hasattr(self, '__dict__'):
+            names += tuple(self.__dict__)
+        for key in names:
             if not for_serialization and key[0] == '_':
                 continue
-            if type(value) is datetime:
-                result[key] = value.strftime(TIMESTAMP_FORMAT)
+            if key == 'created_at':
+                result[key] = _format_timestamp(self._created_at)
+            elif key == 'updated_at':
+                result[key] = _format_timestamp(self._updated_at)
             else:
-                result[key] = value
+                value = getattr(self, key, _UNSET)
+                if value is _UNSET:
+                    continue
+                if type(value) is datetime:
+                    result[key] = value.strftime(TIMESTAMP_FORMAT)
+                else:
+                    result[key] = value
         return result
 
     @classmethod
     def load_from_file(cls):
-        """Load all objects from file"""
+        """Load all objects from the snapshot file and its journal
+
+        A torn journal tail is compacted away under the exclusive lock.
+        """
+        with _file_lock(cls.__name__):
+            complete = cls._load()
+        if not complete:
+            cls.save_to_file()
+
+    @classmethod
+    def _load(cls) -> bool:
+        """Rebuild the objects from the files, False if the journal is
+        torn"""
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
+        flush()
         DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
-
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
+        SORTED_IDS.pop(s_class, None)
+        cls._reset_indexes()
+        JOURNAL_SIZES[s_class] = 0
+        FILE_STATES[s_class] = {'snapshot': _file_signature(file_path),
+                                'journal': 0, 'replayed': []}
+        started = time.perf_counter()
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            objs_json = {}
+            if path.exists(file_path):
+                with open(file_path, 'rb') as f:
+                    objs_json = json.loads(f.read())
+            parsed = time.perf_counter()
+            objs = DATA[s_class]
+            from_json = cls._from_json
             for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+                objs[obj_id] = from_json(obj_json)
+            del objs_json
+            cls._index_all(objs.values())
+        finally:
+            if gc_enabled:
+                gc.enable()
+        built = time.perf_counter()
+        complete = cls._replay_journal()
+        replayed = time.perf_counter()
+        LOAD_STATS[s_class] = {
+            'objects': len(objs),
+            'parse_ms': (parsed - started) * 1000,
+            'build_ms': (built - parsed) * 1000,
+            'replay_ms': (replayed - built) * 1000,
+            'total_ms': (replayed - started) * 1000,
+        }
+        return complete
+
+    @classmethod
+    def refresh_from_file(cls):
+        """Pick up the changes written to the files since the last load
+
+        Only stats the files when nothing changed, replays just the new
+        journal records when the journal grew, and reloads everything
+        when the snapshot was rewritten.
+        """
+        with _file_lock(cls.__name__):
+            complete = cls._catch_up()
+        if not complete:
+            cls.save_to_file()
+
+    @classmethod
+    def _catch_up(cls) -> bool:
+        """Apply what changed in the files, False if the journal is
+        torn"""
+        s_class = cls.__name__
+        flush()
+        state = FILE_STATES.get(s_class)
+        snapshot = _file_signature(".db_{}.json".format(s_class))
+        if state is None or state['snapshot'] != snapshot:
+            return cls._load()
+        journal = _file_signature(".db_{}.journal".format(s_class))
+        journal_size = journal[2] if journal is not None else 0
+        if journal_size < state['journal']:
+            return cls._load()
+        if journal_size > state['journal']:
+            return cls._replay_journal()
+        return True
+
+    @classmethod
+    def _replay_journal(cls) -> bool:
+        """Apply the journal records past the last replayed offset
+
+        The IDs of the objects saved are appended to the 'replayed' list
+        of FILE_STATES, which starts over whenever the files are loaded
+        or rewritten. Return False if a record is corrupt or torn by a
+        crash.
+        """
+        s_class = cls.__name__
+        journal_path = ".db_{}.journal".format(s_class)
+        SORTED_IDS.pop(s_class, None)
+        if not path.exists(journal_path):
+            return True
+
+        offset = FILE_STATES[s_class]['journal']
+        replayed = FILE_STATES[s_class]['replayed']
+        with open(journal_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        complete = data.endswith(b"\n") or not data
+        for line in data.splitlines(True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                complete = False
+                break
+            obj_id = record.get('id')
+            if record.get('op') == 'save':
+                obj = cls._from_json(record.get('obj'))
+                DATA[s_class][obj_id] = obj
+                cls._index_add(obj)
+                replayed.append(obj_id)
+            elif DATA[s_class].pop(obj_id, None) is not None:
+                cls._index_discard(obj_id)
+            offset += len(line)
+            JOURNAL_SIZES[s_class] += 1
+        FILE_STATES[s_class]['journal'] = offset
+        return complete
 
     @classmethod
     def save_to_file(cls):
-        """Save all objects to file"""
+        """Save all objects to the snapshot file and reset the journal
+
+        Other processes append to the same journal, so their records
+        are replayed first, under an exclusive lock that keeps them
+        from appending until the journal is reset.
+        """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        with _file_lock(s_class, exclusive=True):
+            cls._catch_up()
+            objs_json = {}
+            for obj_id, obj in list(DATA[s_class].items()):
+                objs_json[obj_id] = obj.to_json(True)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+            tmp_path = "{}.tmp".format(file_path)
+            with open(tmp_path, 'w') as f:
+                json.dump(objs_json, f)
+            os.replace(tmp_path, file_path)
+            open(".db_{}.journal".format(s_class), 'w').close()
+            JOURNAL_SIZES[s_class] = 0
+            FILE_STATES[s_class] = {'snapshot': _file_signature(file_path),
+                                    'journal': 0, 'replayed': []}
 
-    def save(self):
-        """Save current object"""
+    @classmethod
+    def _append_to_journal(cls, record: dict, durable: bool = True):
+        """Journal one mutation, batched in group commit mode"""
+        if not GROUP_COMMIT['interval']:
+            with _WRITE_LOCK:
+                _write_records([(cls, record)])
+            return
+        with _COMMIT:
+            _PENDING.append((cls, record))
+            _SEQUENCE['queued'] += 1
+            sequence = _SEQUENCE['queued']
+            if len(_PENDING) == 1 or \
+                    len(_PENDING) >= GROUP_COMMIT['batch_size']:
+                _COMMIT.notify_all()
+            while durable and _SEQUENCE['flushed'] < sequence:
+                _COMMIT.wait()
+
+    def save(self, durable: bool = True):
+        """Save current object, waiting for the write if durable"""
         s_class = self.__class__.__name__
-        self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        self._updated_at = int(time.time())
+        with _WRITE_LOCK:
+            if self.id not in DATA[s_class] and s_class in SORTED_IDS:
+                insort(SORTED_IDS[s_class], self.id)
+            DATA[s_class][self.id] = self
+            self.__class__._index_add(self)
+        self.__class__._append_to_journal({'op': 'save', 'id': self.id,
+                                           'obj': self.to_json(True)},
+                                          durable)
 
-    def remove(self):
-        """Remove object"""
+    def remove(self, durable: bool = True):
+        """Remove object, waiting for the write if durable"""
         s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        with _WRITE_LOCK:
+            if DATA[s_class].pop(self.id, None) is None:
+                return
+            ids = SORTED_IDS.get(s_class)
+            if ids is not None:
+                i = bisect_left(ids, self.id)
+                if i < len(ids) and ids[i] == self.id:
+                    del ids[i]
+            self.__class__._index_discard(self.id)
+        self.__class__._append_to_journal({'op': 'remove', 'id': self.id},
+                                          durable)
+
+    @classmethod
+    def _reset_indexes(cls):
+        """Drop every secondary index of the class"""
+        s_class = cls.__name__
+        INDEXES[s_class] = {attr: {} for attr in cls.indexed_attributes}
+        INDEXED_VALUES[s_class] = {}
+
+    @classmethod
+    def _index_add(cls, obj: TypeVar('Base')):
+        """Index an object under its current attribute values"""
+        s_class = cls.__name__
+        if not cls.indexed_attributes:
+            return
+        if s_class not in INDEXES:
+            cls._reset_indexes()
+        cls._index_discard(obj.id)
+        values = {}
+        for attr in cls.indexed_attributes:
+            value = getattr(obj, attr, None)
+            try:
+                INDEXES[s_class][attr].setdefault(value, set()).add(obj.id)
+            except TypeError:
+                continue
+            values[attr] = value
+        INDEXED_VALUES[s_class][obj.id] = values
+
+    @classmethod
+    def _index_all(cls, objs: Iterable[TypeVar('Base')]):
+        """Index objects into freshly reset indexes"""
+        s_class = cls.__name__
+        indexes = INDEXES[s_class]
+        indexed_values = INDEXED_VALUES[s_class]
+        for obj in objs:
+            values = {}
+            for attr in cls.indexed_attributes:
+                value = getattr(obj, attr, None)
+                try:
+                    indexes[attr].setdefault(value, set()).add(obj.id)
+                except TypeError:
+                    continue
+                values[attr] = value
+            indexed_values[obj.id] = values
+
+    @classmethod
+    def _index_discard(cls, obj_id: str):
+        """Remove an object from the indexes"""
+        s_class = cls.__name__
+        values = INDEXED_VALUES.get(s_class, {}).pop(obj_id, None)
+        if values is None:
+            return
+        for attr, value in values.items():
+            ids = INDEXES[s_class][attr].get(value)
+            if ids is not None:
+                ids.discard(obj_id)
+                if not ids:
+                    del INDEXES[s_class][attr][value]
 
     @classmethod
     def count(cls) -> int:
@@ -105,6 +417,19 @@ class Base():
         """Return all objects"""
         return cls.search()
 
+    @classmethod
+    def page(cls, after: str = None,
+             limit: int = None) -> List[TypeVar('Base')]:
+        """Return up to limit objects in ID order, after the ID given"""
+        s_class = cls.__name__
+        with _WRITE_LOCK:
+            ids = SORTED_IDS.get(s_class)
+            if ids is None:
+                ids = SORTED_IDS[s_class] = sorted(DATA[s_class])
+            start = bisect_right(ids, after) if after is not None else 0
+            end = start + limit if limit is not None else len(ids)
+            return [DATA[s_class][obj_id] for obj_id in ids[start:end]]
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """Return one object by ID"""
@@ -124,4 +449,182 @@ class Base():
                     return False
             return True
 
-        return list(filter(_search, DATA[s_class].values()))
+        objs = DATA[s_class].values()
+        indexes = INDEXES.get(s_class, {})
+        for k, v in attributes.items():
+            if k not in indexes:
+                continue
+            try:
+                ids = indexes[k].get(v, ())
+            except TypeError:
+                continue
+            objs = [DATA[s_class][obj_id] for obj_id in ids
+                    if obj_id in DATA[s_class]]
+            break
+        return list(filter(_search, objs))
+
+
+def _parse_timestamp(value: str) -> int:
+    """Convert a TIMESTAMP_FORMAT string to UTC epoch seconds
+
+    The fixed layout is sliced by hand; anything else falls back to
+    strptime, which also raises the usual ValueError.
+    """
+    if len(value) == 19 and value[10] == 'T' and value[13] == ':' and \
+            value[16] == ':':
+        day = _day_epoch(value[:10])
+        clock = value[11:13] + value[14:16] + value[17:19]
+        if day is not None and clock.isascii() and clock.isdigit():
+            hour, minute, second = int(clock[0:2]), int(clock[2:4]), \
+                int(clock[4:6])
+            if hour < 24 and minute < 60 and second < 62:
+                return day + hour * 3600 + minute * 60 + second
+    return calendar.timegm(time.strptime(value, TIMESTAMP_FORMAT))
+
+
+@lru_cache(maxsize=4096)
+def _day_epoch(date: str) -> int:
+    """UTC epoch of midnight on a YYYY-MM-DD date, None if invalid
+
+    Cached: the timestamps of a snapshot share few distinct days.
+    """
+    if date[4] != '-' or date[7] != '-':
+        return None
+    digits = date[0:4] + date[5:7] + date[8:10]
+    if not digits.isascii() or not digits.isdigit():
+        return None
+    year, month, day = int(digits[0:4]), int(digits[4:6]), int(digits[6:8])
+    if not year or not 1 <= month <= 12:
+        return None
+    month_days = 29 if month == 2 and calendar.isleap(year) \
+        else MONTH_DAYS[month]
+    if not 1 <= day <= month_days:
+        return None
+    return _days_from_civil(year, month, day) * 86400
+
+
+def _days_from_civil(year: int, month: int, day: int) -> int:
+    """Days between 1970-01-01 and a proleptic Gregorian date"""
+    if month <= 2:
+        year -= 1
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + \
+        day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - \
+        year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _format_timestamp(epoch: int) -> str:
+    """Convert UTC epoch seconds to a TIMESTAMP_FORMAT string"""
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(epoch))
+
+
+def _file_signature(file_path: str) -> tuple:
+    """Return what identifies a version of a file, None if missing"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+@contextmanager
+def _file_lock(s_class: str, exclusive: bool = False):
+    """Hold the lock file of a class, shared or exclusive
+
+    Appends share it; compaction takes it exclusively. Re-entrant
+    within a process, upgrading a shared hold when asked to.
+    """
+    with _WRITE_LOCK:
+        held = _FILE_LOCKS.get(s_class)
+        if held is None or held['pid'] != os.getpid():
+            fd = os.open(".db_{}.lock".format(s_class),
+                         os.O_RDWR | os.O_CREAT, 0o644)
+            held = _FILE_LOCKS[s_class] = {'fd': fd, 'pid': os.getpid(),
+                                           'depth': 0, 'exclusive': False}
+        if held['depth'] == 0 or exclusive and not held['exclusive']:
+            fcntl.flock(held['fd'],
+                        fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            held['exclusive'] = exclusive
+        held['depth'] += 1
+        try:
+            yield
+        finally:
+            held['depth'] -= 1
+            if held['depth'] == 0:
+                fcntl.flock(held['fd'], fcntl.LOCK_UN)
+                held['exclusive'] = False
+
+
+def _write_records(records: list):
+    """Append journal records, grouped into one write per class"""
+    batches = {}
+    for cls, record in records:
+        batches.setdefault(cls, []).append(json.dumps(record) + "\n")
+    for cls, lines in batches.items():
+        s_class = cls.__name__
+        data = "".join(lines).encode('utf-8')
+        with _file_lock(s_class), \
+                open(".db_{}.journal".format(s_class), 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+        state = FILE_STATES.get(s_class)
+        if state is not None and state['journal'] == offset:
+            state['journal'] = offset + len(data)
+        JOURNAL_SIZES[s_class] = JOURNAL_SIZES.get(s_class, 0) + len(lines)
+        if JOURNAL_SIZES[s_class] >= JOURNAL_MAX_RECORDS:
+            cls.save_to_file()
+
+
+def flush():
+    """Write every pending journal record and wake durable waiters"""
+    with _WRITE_LOCK:
+        with _COMMIT:
+            records = list(_PENDING)
+            del _PENDING[:]
+            sequence = _SEQUENCE['queued']
+        try:
+            _write_records(records)
+        finally:
+            with _COMMIT:
+                _SEQUENCE['flushed'] = max(_SEQUENCE['flushed'], sequence)
+                _COMMIT.notify_all()
+
+
+def _flush_loop():
+    """Flush pending records every interval or batch_size mutations"""
+    while True:
+        with _COMMIT:
+            while not _PENDING:
+                _COMMIT.wait()
+            deadline = time.monotonic() + GROUP_COMMIT['interval']
+            while len(_PENDING) < GROUP_COMMIT['batch_size']:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                _COMMIT.wait(remaining)
+        flush()
+
+
+def enable_group_commit(interval: float = 0.05, batch_size: int = 100):
+    """Coalesce journal writes: at most one per interval or batch_size
+    mutations, with save(durable=False) returning before the write"""
+    if interval <= 0 or batch_size < 1:
+        raise ValueError("interval and batch_size must be positive")
+    with _COMMIT:
+        GROUP_COMMIT['interval'] = interval
+        GROUP_COMMIT['batch_size'] = batch_size
+        if not _FLUSHER:
+            flusher = threading.Thread(target=_flush_loop, daemon=True)
+            _FLUSHER.append(flusher)
+            flusher.start()
+            atexit.register(flush)
+
+
+def disable_group_commit():
+    """Go back to writing every mutation inline"""
+    with _COMMIT:
+        GROUP_COMMIT['interval'] = 0
+    flush()
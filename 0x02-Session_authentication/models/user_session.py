@@ -8,6 +8,9 @@ from models.base import Base
 class UserSession(Base):
     """UserSession class"""
 
+    __slots__ = ('user_id', 'session_id')
+    indexed_attributes = ('session_id',)
+
     def __init__(self, *args: list, **kwargs: dict):
         """Initialize a UserSession instance"""
         super().__init__(*args, **kwargs)
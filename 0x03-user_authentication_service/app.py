@@ -1,12 +1,24 @@
 #!/usr/bin/env python3
 """Flask app for the authentication service."""
+import hmac
+import os
 from flask import Flask, jsonify, request, abort, redirect
 from auth import Auth
 
+# /users/bulk is closed unless an admin token is configured
+BULK_ADMIN_TOKEN = os.getenv("BULK_ADMIN_TOKEN")
+BULK_MAX_USERS = int(os.getenv("BULK_MAX_USERS", "1000"))
+
 app = Flask(__name__)
 AUTH = Auth()
 
 
+@app.teardown_appcontext
+def release_db_session(exception=None) -> None:
+    """Release the DB session used by the request."""
+    AUTH.release_db_session()
+
+
 @app.route('/', methods=['GET'], strict_slashes=False)
 def index() -> str:
     """Return a JSON payload."""
@@ -25,6 +37,38 @@ def users() -> str:
         return jsonify({"message": "email already registered"}), 400
 
 
+@app.route('/users/bulk', methods=['POST'], strict_slashes=False)
+def bulk_users() -> str:
+    """Register a JSON list of {"email", "password"} objects.
+
+    Admin only: the request needs an "Authorization: Bearer <token>"
+    header matching BULK_ADMIN_TOKEN, and at most BULK_MAX_USERS users.
+    """
+    if not BULK_ADMIN_TOKEN:
+        abort(403)
+    authorization = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(authorization.encode(),
+                               "Bearer {}".format(BULK_ADMIN_TOKEN).encode()):
+        abort(401)
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, list) or \
+            not all(isinstance(row, dict) for row in payload):
+        return jsonify({"message": "expected a list of users"}), 400
+    if len(payload) > BULK_MAX_USERS:
+        return jsonify({"message": "at most {} users per request".format(
+            BULK_MAX_USERS)}), 413
+    messages = {
+        "created": "user created",
+        "exists": "email already registered",
+        "duplicate": "email repeated in request",
+        "invalid": "email and password required",
+    }
+    results = AUTH.register_users((row.get('email'), row.get('password'))
+                                  for row in payload)
+    return jsonify([{"email": email, "message": messages[status]}
+                    for email, status in results])
+
+
 @app.route('/sessions', methods=['POST'], strict_slashes=False)
 def login():
     """Log in the user."""
@@ -1,15 +1,74 @@
 #!/usr/bin/env python3
 """Auth module for the authentication service."""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, List, Tuple
 import bcrypt
 from db import DB
 from user import User
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
 from uuid import uuid4
 
+TARGET_HASH_MS = float(os.getenv("BCRYPT_TARGET_MS", "250"))
+MIN_ROUNDS = 12
+MAX_ROUNDS = 16
+CALIBRATION_SAMPLES = 3
+REGISTER_BATCH_SIZE = 1000
+
+
+_ROUNDS = []
+_ROUNDS_LOCK = threading.Lock()
+
+
+def _calibrate_rounds(target_ms: float = TARGET_HASH_MS) -> int:
+    """Pick the highest bcrypt cost whose hash time fits target_ms.
+
+    Each extra round doubles the hash time, so probe hashes at
+    MIN_ROUNDS are enough to extrapolate the others. The fastest of
+    CALIBRATION_SAMPLES probes is used, as contention only slows them.
+    """
+    rounds = MIN_ROUNDS
+    elapsed_ms = None
+    for _ in range(CALIBRATION_SAMPLES):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+        probe_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms is None or probe_ms < elapsed_ms:
+            elapsed_ms = probe_ms
+    while rounds < MAX_ROUNDS and elapsed_ms * 2 <= target_ms:
+        elapsed_ms *= 2
+        rounds += 1
+    return rounds
+
+
+def _bcrypt_rounds() -> int:
+    """Return the cost for new hashes, pinned by BCRYPT_ROUNDS if set.
+
+    Calibrated once, under a lock, so concurrent first callers do not
+    each probe while the others hash.
+    """
+    if not _ROUNDS:
+        with _ROUNDS_LOCK:
+            if not _ROUNDS:
+                pinned = os.getenv("BCRYPT_ROUNDS")
+                _ROUNDS.append(int(pinned) if pinned
+                               else _calibrate_rounds())
+    return _ROUNDS[0]
+
+
+def _needs_rehash(hashed_password: bytes) -> bool:
+    """Check whether a hash was made with a weaker cost than the current."""
+    return int(hashed_password.split(b"$")[2]) < _bcrypt_rounds()
+
 
 def _hash_password(password: str) -> bytes:
     """Hash a password for storing."""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    return bcrypt.hashpw(password.encode('utf-8'),
+                         bcrypt.gensalt(_bcrypt_rounds()))
 
 
 def _generate_uuid() -> str:
@@ -22,6 +81,11 @@ class Auth:
 
     def __init__(self):
         self._db = DB()
+        _bcrypt_rounds()
+
+    def release_db_session(self) -> None:
+        """Give the current thread's DB session back to the pool."""
+        self._db.remove_session()
 
     def register_user(self, email: str, password: str) -> User:
         """Register a new user."""
@@ -30,27 +94,83 @@ class Auth:
             raise ValueError(f"User {email} already exists")
         except NoResultFound:
             hashed_password = _hash_password(password)
-            user = self._db.add_user(email, hashed_password)
-            return user
+            try:
+                return self._db.add_user(email, hashed_password)
+            except IntegrityError:
+                raise ValueError(f"User {email} already exists")
+
+    def register_users(self, users: Iterable[Tuple[str, str]],
+                       batch_size: int = REGISTER_BATCH_SIZE
+                       ) -> List[Tuple[str, str]]:
+        """Register many (email, password) pairs.
+
+        Works through the input batch_size rows at a time: one query
+        finds the emails already taken, bcrypt runs on every core (it
+        releases the GIL), and the new users go in with one executemany
+        per batch. Returns (email, status) per input row, status being
+        "created", "exists", "duplicate" (repeated in the input) or
+        "invalid" (email or password missing).
+        """
+        results = []
+        seen = set()
+        rows = iter(users)
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    return results
+                statuses = [None] * len(batch)
+                pending = []
+                for i, (email, password) in enumerate(batch):
+                    if not isinstance(email, str) or not email or \
+                            not isinstance(password, str) or not password:
+                        statuses[i] = "invalid"
+                    elif email in seen:
+                        statuses[i] = "duplicate"
+                    else:
+                        seen.add(email)
+                        pending.append(i)
+                existing = self._db.find_existing_emails(
+                    batch[i][0] for i in pending)
+                for i in pending:
+                    if batch[i][0] in existing:
+                        statuses[i] = "exists"
+                pending = [i for i in pending if statuses[i] is None]
+                hashed_passwords = executor.map(
+                    _hash_password, [batch[i][1] for i in pending])
+                inserted = self._db.add_users(
+                    list(zip([batch[i][0] for i in pending],
+                             hashed_passwords)))
+                for i, created in zip(pending, inserted):
+                    statuses[i] = "created" if created else "exists"
+                results.extend((email, status) for (email, _), status
+                               in zip(batch, statuses))
 
     def valid_login(self, email: str, password: str) -> bool:
-        """Check if the login credentials are valid."""
+        """Check if the login credentials are valid.
+
+        A valid password stored with a stale bcrypt cost is rehashed
+        with the current one.
+        """
         try:
             user = self._db.find_user_by(email=email)
-            return bcrypt.checkpw(password.encode('utf-8'),
-                                  user.hashed_password)
         except NoResultFound:
             return False
+        if not bcrypt.checkpw(password.encode('utf-8'),
+                              user.hashed_password):
+            return False
+        if _needs_rehash(user.hashed_password):
+            self._db.update_user(user.id,
+                                 hashed_password=_hash_password(password))
+        return True
 
     def create_session(self, email: str) -> str:
         """Create a new session for the user."""
-        try:
-            user = self._db.find_user_by(email=email)
-            session_id = _generate_uuid()
-            self._db.update_user(user.id, session_id=session_id)
-            return session_id
-        except NoResultFound:
+        session_id = _generate_uuid()
+        if not self._db.update_users_by({"session_id": session_id},
+                                        email=email):
             return None
+        return session_id
 
     def get_user_from_session_id(self, session_id: str) -> User:
         """Find a user by session ID."""
@@ -68,13 +188,11 @@ class Auth:
 
     def get_reset_password_token(self, email: str) -> str:
         """Generate a reset password token."""
-        try:
-            user = self._db.find_user_by(email=email)
-            reset_token = _generate_uuid()
-            self._db.update_user(user.id, reset_token=reset_token)
-            return reset_token
-        except NoResultFound:
+        reset_token = _generate_uuid()
+        if not self._db.update_users_by({"reset_token": reset_token},
+                                        email=email):
             raise ValueError
+        return reset_token
 
     def update_password(self, reset_token: str, password: str) -> None:
         """Update the user's password."""
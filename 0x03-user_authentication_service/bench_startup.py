@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Startup benchmark: DB() against a fresh, a populated and a legacy
+(unversioned, unindexed) database, and the old drop_all/create_all path
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from db import DB
+from user import Base
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+RUNS = 20
+
+
+def timed(function) -> float:
+    """Median wall time of function() in milliseconds"""
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+
+def populate(file_path: str, users: int) -> None:
+    """Create an unversioned, unindexed users table holding users rows"""
+    connection = sqlite3.connect(file_path)
+    connection.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, "
+                       "email VARCHAR(250) NOT NULL, "
+                       "hashed_password VARCHAR(250) NOT NULL, "
+                       "session_id VARCHAR(250), "
+                       "reset_token VARCHAR(250))")
+    connection.executemany("INSERT INTO users (email, hashed_password) "
+                           "VALUES (?, 'x')",
+                           (("user{}@example.com".format(i),)
+                            for i in range(users)))
+    connection.commit()
+    connection.close()
+
+
+def legacy_startup(url: str) -> None:
+    """What DB() used to do: recreate every table"""
+    db = DB(url)
+    Base.metadata.drop_all(db._engine)
+    Base.metadata.create_all(db._engine)
+    db._engine.dispose()
+
+
+def startup(url: str) -> None:
+    """Open the database the way the service does"""
+    DB(url)._engine.dispose()
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        fresh = os.path.join(directory, "fresh.db")
+        legacy = os.path.join(directory, "legacy.db")
+        populate(legacy, USERS)
+
+        def fresh_startup():
+            if os.path.exists(fresh):
+                os.remove(fresh)
+            startup("sqlite:///" + fresh)
+
+        start = time.perf_counter()
+        startup("sqlite:///" + legacy)
+        migration = (time.perf_counter() - start) * 1000
+        print("fresh database        {:8.2f} ms".format(
+            timed(fresh_startup)))
+        print("migrate {:<7} users {:8.2f} ms (once)".format(
+            USERS, migration))
+        print("current schema        {:8.2f} ms".format(
+            timed(lambda: startup("sqlite:///" + legacy))))
+        print("drop_all/create_all   {:8.2f} ms".format(
+            timed(lambda: legacy_startup("sqlite:///" + fresh))))
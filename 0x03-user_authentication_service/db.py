@@ -1,39 +1,238 @@
 #!/usr/bin/env python3
 """DB module for the authentication service."""
-from sqlalchemy import create_engine
+import os
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import (bindparam, create_engine, event, func, inspect,
+                        text, update)
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from sqlalchemy.pool import QueuePool, StaticPool
 
 from user import Base, User
 
+DATABASE_URL = os.getenv("DB_URL", "sqlite:///a.db")
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") not in ("0", "false")
+SQLITE_WAL = os.getenv("DB_SQLITE_WAL", "1") not in ("0", "false")
+RESET_SCHEMA = os.getenv("DB_RESET", "0") not in ("0", "false")
+# Bump when tables or indexes are added so existing databases pick them
+# up; migrate() cannot add or alter columns and refuses to run if a
+# table lacks one
+SCHEMA_VERSION = 1
+IN_CLAUSE_SIZE = 500
+USER_COLUMNS = frozenset(column.key for column in inspect(User).column_attrs)
+
+
+def _enable_wal(dbapi_connection, connection_record) -> None:
+    """Switch a new SQLite connection to WAL journaling.
+
+    WAL lets readers proceed while one writer commits; NORMAL sync is
+    durable across application crashes and much cheaper than FULL.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def migrate(bind) -> list:
+    """Bring an existing database up to the current schema in place.
+
+    Creates missing tables and the indexes declared on the models,
+    keeping every row. bind is an engine or a connection, the latter
+    letting the caller hold a lock across the whole migration. Returns
+    the names of the indexes created. Raises ValueError if an existing
+    table lacks a column declared on its model, or if duplicate emails
+    block the unique index.
+    """
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {column["name"]
+                    for column in inspector.get_columns(table.name)}
+        missing = [column.name for column in table.columns
+                   if column.name not in existing]
+        if missing:
+            raise ValueError("table {} lacks columns {}; migrate it by "
+                             "hand".format(table.name, ", ".join(missing)))
+    Base.metadata.create_all(bind)
+    created = []
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"]
+                    for index in inspect(bind).get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name in existing:
+                continue
+            if index.unique:
+                _check_unique(bind, table, index)
+            index.create(bind=bind)
+            created.append(index.name)
+    return created
+
+
+def _check_unique(bind, table, index) -> None:
+    """Raise ValueError if the rows already break a unique index."""
+    columns = list(index.columns)
+    session = sessionmaker(bind=bind)()
+    try:
+        duplicate = session.query(*columns).group_by(*columns) \
+            .having(func.count() > 1).first()
+    finally:
+        session.close()
+    if duplicate is not None:
+        raise ValueError("cannot create {}: duplicate {}".format(
+            index.name, tuple(duplicate)))
+
+
+def ensure_schema(engine) -> list:
+    """Create or migrate the schema unless it is already current.
+
+    SQLite databases record SCHEMA_VERSION in PRAGMA user_version, so
+    an up-to-date database costs a single pragma read at startup. When
+    it is not current, the version is read again, the schema migrated
+    and the version written in one BEGIN EXCLUSIVE transaction, so
+    workers starting together migrate one at a time and the later ones
+    find the work done. Other backends always go through migrate().
+    Returns the names of the indexes created.
+    """
+    if engine.dialect.name != "sqlite":
+        return migrate(engine)
+    with engine.connect() as connection:
+        version = connection.execute(text("PRAGMA user_version")).scalar()
+    if version == SCHEMA_VERSION:
+        return []
+    with engine.connect() as connection:
+        connection = connection.execution_options(
+            isolation_level="AUTOCOMMIT")
+        connection.execute(text("BEGIN EXCLUSIVE"))
+        try:
+            version = connection.execute(
+                text("PRAGMA user_version")).scalar()
+            if version > SCHEMA_VERSION:
+                raise ValueError("database schema version {} is newer "
+                                 "than {}".format(version, SCHEMA_VERSION))
+            created = []
+            if version < SCHEMA_VERSION:
+                created = migrate(connection)
+                connection.execute(text("PRAGMA user_version = {:d}"
+                                        .format(SCHEMA_VERSION)))
+        except Exception:
+            connection.execute(text("ROLLBACK"))
+            raise
+        connection.execute(text("COMMIT"))
+    return created
+
 
 class DB:
-    """DB class for database operations."""
+    """DB class for database operations.
+
+    Every thread gets its own session from a scoped_session registry;
+    call remove_session() when a request ends to give its connection
+    back to the engine pool.
+    """
+
+    def __init__(self, url: str = DATABASE_URL,
+                 pool_size: int = POOL_SIZE,
+                 max_overflow: int = MAX_OVERFLOW,
+                 pool_pre_ping: bool = POOL_PRE_PING,
+                 sqlite_wal: bool = SQLITE_WAL,
+                 reset: bool = RESET_SCHEMA):
+        """Initialize a new DB instance.
 
-    def __init__(self):
-        """Initialize a new DB instance."""
-        self._engine = create_engine("sqlite:///a.db", echo=False)
-        Base.metadata.drop_all(self._engine)
-        Base.metadata.create_all(self._engine)
-        self.__session = None
+        Existing data is kept unless reset is True, which drops every
+        table first.
+        """
+        options = {"echo": False, "pool_pre_ping": pool_pre_ping}
+        parsed = make_url(url)
+        sqlite = parsed.get_backend_name() == "sqlite"
+        in_memory = sqlite and parsed.database in (None, "", ":memory:")
+        if in_memory:
+            options["poolclass"] = StaticPool
+        else:
+            options.update(poolclass=QueuePool, pool_size=pool_size,
+                           max_overflow=max_overflow)
+        if sqlite:
+            options["connect_args"] = {"check_same_thread": False}
+        self._engine = create_engine(url, **options)
+        if sqlite and sqlite_wal and not in_memory:
+            event.listen(self._engine, "connect", _enable_wal)
+        if reset:
+            Base.metadata.drop_all(self._engine)
+            if sqlite:
+                with self._engine.begin() as connection:
+                    connection.execute(text("PRAGMA user_version = 0"))
+        ensure_schema(self._engine)
+        self.__session = scoped_session(sessionmaker(bind=self._engine))
 
     @property
     def _session(self):
-        """Memoized session object."""
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        """Session object of the current thread."""
+        return self.__session()
+
+    def remove_session(self) -> None:
+        """Close the session of the current thread, if any."""
+        self.__session.remove()
+
+    def _commit(self) -> None:
+        """Commit the current session, rolling back if that fails."""
+        try:
+            self._session.commit()
+        except Exception:
+            self._session.rollback()
+            raise
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """Add a new user to the database."""
         new_user = User(email=email, hashed_password=hashed_password)
         self._session.add(new_user)
-        self._session.commit()
+        self._commit()
         return new_user
 
+    def add_users(self, users: List[Tuple[str, bytes]]) -> List[bool]:
+        """Insert (email, hashed_password) pairs in one transaction.
+
+        The rows go out in a single executemany; if a concurrent
+        registration makes it fail, they are retried one by one.
+        Returns whether each row was inserted.
+        """
+        if not users:
+            return []
+        insert = User.__table__.insert()
+        params = [{"email": email, "hashed_password": hashed_password}
+                  for email, hashed_password in users]
+        try:
+            self._session.execute(insert, params)
+            self._commit()
+            return [True] * len(params)
+        except IntegrityError:
+            self._session.rollback()
+        inserted = []
+        for row in params:
+            try:
+                self._session.execute(insert, row)
+                self._commit()
+                inserted.append(True)
+            except IntegrityError:
+                self._session.rollback()
+                inserted.append(False)
+        return inserted
+
+    def find_existing_emails(self, emails: Iterable[str]) -> set:
+        """Return which of the emails already belong to a user."""
+        emails = list(emails)
+        existing = set()
+        for start in range(0, len(emails), IN_CLAUSE_SIZE):
+            chunk = emails[start:start + IN_CLAUSE_SIZE]
+            existing.update(email for email, in self._session.query(
+                User.email).filter(User.email.in_(chunk)))
+        return existing
+
     def find_user_by(self, **kwargs) -> User:
         """Find a user in the database based on input arguments."""
         if not kwargs:
@@ -44,11 +243,63 @@ class DB:
         except NoResultFound:
             raise NoResultFound
 
-    def update_user(self, user_id: int, **kwargs) -> None:
-        """Update user attributes."""
-        user = self.find_user_by(id=user_id)
-        for key, value in kwargs.items():
-            if not hasattr(user, key):
+    def _check_columns(self, values: dict) -> None:
+        """Raise ValueError unless every key is a column of User."""
+        for key in values:
+            if key not in USER_COLUMNS:
                 raise ValueError
-            setattr(user, key, value)
-        self._session.commit()
+
+    def update_user(self, user_id: int, **kwargs) -> None:
+        """Update user attributes with a single UPDATE statement."""
+        self._check_columns(kwargs)
+        if not kwargs:
+            self.find_user_by(id=user_id)
+            return
+        if self.update_users_by(kwargs, id=user_id) == 0:
+            raise NoResultFound
+
+    def update_users_by(self, values: dict, **kwargs) -> int:
+        """Set values on every user matching the input arguments.
+
+        Returns the number of users updated.
+        """
+        if not kwargs:
+            raise InvalidRequestError
+        self._check_columns(values)
+        try:
+            count = self._session.query(User).filter_by(**kwargs) \
+                .update(values, synchronize_session=False)
+        except Exception:
+            self._session.rollback()
+            raise
+        self._commit()
+        return count
+
+    def update_users(self, updates: Dict[int, dict]) -> int:
+        """Apply {user_id: {attribute: value}} in one transaction.
+
+        Updates setting the same attributes share one executemany
+        statement. Returns the number of users updated.
+        """
+        batches = {}
+        for user_id, values in updates.items():
+            self._check_columns(values)
+            if values:
+                params = dict(values, _user_id=user_id)
+                batches.setdefault(frozenset(values), []).append(params)
+        table = User.__table__
+        statement = update(table).where(table.c.id == bindparam("_user_id"))
+        count = 0
+        try:
+            for params in batches.values():
+                count += self._session.execute(statement, params).rowcount
+        except Exception:
+            self._session.rollback()
+            raise
+        self._commit()
+        return count
+
+
+if __name__ == "__main__":
+    for name in ensure_schema(create_engine(DATABASE_URL)):
+        print("created index {}".format(name))